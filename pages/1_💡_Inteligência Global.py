@@ -4,7 +4,10 @@ import pandas as pd
 import altair as alt
 from fpdf import FPDF
 import io
-from datetime import datetime, timedelta
+from datetime import datetime
+from services.coalescencia import get_consultas
+from services.heatmaps import get_painel_heatmaps
+from services.snapshots import get_refresher
 
 # --- CONEXÃO COM O SUPABASE ---
 @st.cache_resource
@@ -15,27 +18,35 @@ def init_connection() -> Client:
 
 supabase = init_connection()
 
+# Fotografia partilhada entre todas as sessões, atualizada em segundo plano
+refresher = get_refresher(supabase)
+snapshot = refresher.snapshot
+calendario = refresher.calendario
+consenso = refresher.consenso
+# Consultas idênticas e simultâneas de sessões diferentes partilham uma única ida ao banco
+consultas = get_consultas(supabase)
+# Corpus de análises em colunas, partilhado e somente leitura; as vistas abaixo recebem fatias dele
+corpus = refresher.corpus.corpus
+# Matrizes da visão geral, atualizadas só quando o corpus ou as referências mudam
+heatmaps = get_painel_heatmaps()
+heatmaps.atualizar(corpus, snapshot)
+
 # --- FUNÇÕES DE CONSULTA AO BANCO ---
 def get_paises():
-    response = supabase.table('paises').select('id, nome, emoji_bandeira').execute()
-    return {f"{item['nome']} {item['emoji_bandeira']}": item['id'] for item in response.data}
+    return {f"{item['nome']} {item['emoji_bandeira']}": item['id'] for item in snapshot.paises}
 
-@st.cache_data(ttl=600)
 def get_classes_de_ativos():
-    response = supabase.table('classes_de_ativos').select('id, nome').execute()
-    return {"--Selecione--": None, **{item['nome']: item['id'] for item in response.data}}
+    return {"--Selecione--": None, **{item['nome']: item['id'] for item in snapshot.classes_de_ativos}}
 
 @st.cache_data(ttl=600)
 def get_subclasses_de_ativos(classe_pai_id):
     if not classe_pai_id:
         return {"--Selecione--": None}
-    response = supabase.table('subclasses_de_ativos').select('id, nome').eq('classe_pai_id', classe_pai_id).execute()
-    return {"--Selecione--": None, **{item['nome']: item['id'] for item in response.data}}
+    subclasses = consultas.consultar('subclasses_de_ativos', 'id, nome', filtros=[('eq', 'classe_pai_id', classe_pai_id)])
+    return {"--Selecione--": None, **{item['nome']: item['id'] for item in subclasses}}
 
-@st.cache_data(ttl=600)
 def get_temas():
-    response = supabase.table('temas').select('id, nome').execute()
-    return {"--Selecione--": None, **{item['nome']: item['id'] for item in response.data}}
+    return {"--Selecione--": None, **{item['nome']: item['id'] for item in snapshot.temas}}
 
 # --- FUNÇÃO DE VISUALIZAÇÃO ---
 def create_timeline_chart(data):
@@ -65,6 +76,25 @@ def create_timeline_chart(data):
     
     return chart
 
+def create_heatmap_chart(df, titulo_linha, titulo_coluna):
+    """Cria um heatmap com a visão mais recente e o número de análises de cada célula."""
+    if df.empty:
+        return None
+
+    base = alt.Chart(df).encode(
+        x=alt.X('coluna:N', title=titulo_coluna),
+        y=alt.Y('linha:N', title=titulo_linha),
+    )
+    celulas = base.mark_rect().encode(
+        color=alt.Color('score:Q', title='Visão', scale=alt.Scale(domain=[-1, 1], scheme='redyellowgreen'),
+                        legend=alt.Legend(values=[-1, 0, 1], labelExpr="datum.value == 1 ? 'Overweight' : datum.value == 0 ? 'Neutral' : 'Underweight'")),
+        tooltip=[alt.Tooltip('linha:N', title=titulo_linha), alt.Tooltip('coluna:N', title=titulo_coluna),
+                 alt.Tooltip('visao:N', title='Última visão'), alt.Tooltip('n_analises:Q', title='Análises'),
+                 alt.Tooltip('data:T', title='Data da última visão')]
+    )
+    contagens = base.mark_text(baseline='middle').encode(text='n_analises:Q')
+    return celulas + contagens
+
 def display_analises(analises):
     """Função reutilizável para exibir uma lista de análises."""
     if not analises:
@@ -130,14 +160,14 @@ st.write("Visões e estratégias consolidadas para o investidor global.")
 st.markdown("---")
 
 # --- NAVEGAÇÃO INTERNA COM ABAS ---
-tab_hub, tab_macro, tab_assets, tab_micro, tab_thematic, tab_report = st.tabs([
-    "📍 Hub", "🌍 Macro View", "📊 Assets View", "🔬 MicroAssets View", "🎨 Thematic View", "📄 Research Report"
+tab_hub, tab_macro, tab_assets, tab_micro, tab_thematic, tab_calendario, tab_report = st.tabs([
+    "📍 Hub", "🌍 Macro View", "📊 Assets View", "🔬 MicroAssets View", "🎨 Thematic View", "🗓️ Calendário", "📄 Research Report"
 ])
 
 # --- ABA HUB ---
 with tab_hub:
     st.header("📍 Hub de Inteligência Global")
-    st.markdown(f"**Última atualização:** {datetime.now().strftime('%d de %B de %Y, %H:%M')}")
+    st.markdown(f"**Última atualização:** {(snapshot.atualizado_em or datetime.now()).strftime('%d de %B de %Y, %H:%M')}")
     st.markdown("---")
 
     # Layout em duas colunas
@@ -146,13 +176,9 @@ with tab_hub:
     with col1:
         st.subheader("📰 Novas Análises")
         
-        # Busca as 5 análises mais recentes
-        novas_analises = supabase.table('analises').select(
-            'titulo, resumo, tipo_analise, gestoras(nome)'
-        ).order('data_publicacao', desc=True).limit(5).execute()
-        
-        if novas_analises.data:
-            for analise in novas_analises.data:
+        # As 5 análises mais recentes, lidas da fotografia partilhada
+        if snapshot.novas_analises:
+            for analise in snapshot.novas_analises:
                 with st.container(border=True):
                     gestora = analise['gestoras']['nome'] if analise.get('gestoras') else "Interna"
                     st.write(f"**{analise['titulo']}**")
@@ -164,14 +190,12 @@ with tab_hub:
     with col2:
         st.subheader("⚠️ Alertas Recentes")
         
-        # Busca os 5 alertas mais recentes
-        alertas = supabase.table('alertas').select('*').order('created_at', desc=True).limit(5).execute()
-        
-        if alertas.data:
-            for alerta in alertas.data:
+        # Os 5 alertas mais recentes, lidos da fotografia partilhada
+        if snapshot.alertas:
+            for alerta in snapshot.alertas:
                 emoji_map = {'Alta': '🔴', 'Média': '🟡', 'Baixa': '🟢'}
                 st.markdown(f"{emoji_map.get(alerta['importancia'], '')} **{alerta['titulo']}** ({alerta['tipo_alerta']})")
-                if alerta['descricao']:
+                if alerta.get('descricao'):
                     st.caption(alerta['descricao'])
         else:
             st.info("Nenhum alerta recente.")
@@ -180,19 +204,12 @@ with tab_hub:
         
         st.subheader("🗓️ Próximos Eventos do Calendário")
         
-        # Busca eventos dos próximos 7 dias
-        hoje = datetime.today().date()
-        proxima_semana = hoje + timedelta(days=7)
-        eventos = supabase.table('eventos_calendario').select(
-            'data_evento, nome_evento, importancia, paises(nome, emoji_bandeira)'
-        ).gte('data_evento', hoje.isoformat()).lte('data_evento', proxima_semana.isoformat()).order('data_evento').execute()
-
-        if eventos.data:
-            for evento in eventos.data:
-                data = pd.to_datetime(evento['data_evento']).strftime('%d/%m')
-                pais = evento['paises']['nome'] if evento.get('paises') else "Global"
-                emoji = evento['paises']['emoji_bandeira'] if evento.get('paises') else "🌍"
-                st.write(f"**{data}** - {evento['nome_evento']} ({pais} {emoji}) - *Importância: {evento['importancia']}*")
+        # Eventos dos próximos 7 dias, servidos pelo índice em memória
+        eventos = calendario.proximos(7)
+
+        if eventos:
+            for evento in eventos:
+                st.write(f"**{evento.data.strftime('%d/%m')}** - {evento.nome} ({evento.pais_nome} {evento.pais_emoji}) - *Importância: {evento.importancia}*")
         else:
             st.info("Nenhum evento importante nos próximos 7 dias.")
 
@@ -211,11 +228,11 @@ with tab_macro:
 
         # --- PAINEL DE INDICADORES ECONÔMICOS ---
         st.subheader("Painel de Indicadores")
-        indicadores_response = supabase.table('indicadores_economicos').select('*').eq('pais_id', pais_selecionado_id).execute()
+        indicadores = consultas.consultar('indicadores_economicos', filtros=[('eq', 'pais_id', pais_selecionado_id)])
         
-        if indicadores_response.data:
+        if indicadores:
             cols = st.columns(4) # Cria 4 colunas para os métricos
-            for i, indicador in enumerate(indicadores_response.data):
+            for i, indicador in enumerate(indicadores):
                 col = cols[i % 4]
                 with col:
                     st.metric(
@@ -230,10 +247,10 @@ with tab_macro:
 
         # --- PAINEL VISÃO BANCO CENTRAL ---
         st.subheader("Visão do Banco Central")
-        bc_response = supabase.table('analises').select('*').eq('pais_id', pais_selecionado_id).eq('tipo_analise', 'Visão BC').order('data_publicacao', desc=True).limit(1).execute()
+        analises_bc = corpus.linhas(corpus.ordenar_por_data(corpus.filtrar('Visão BC', pais_id=pais_selecionado_id), limite=1))
 
-        if bc_response.data:
-            analise_bc = bc_response.data[0]
+        if analises_bc:
+            analise_bc = analises_bc[0]
             with st.container(border=True):
                 st.write(f"**{analise_bc['titulo']}**")
                 st.caption(f"Publicado em: {pd.to_datetime(analise_bc['data_publicacao']).strftime('%d/%m/%Y')}")
@@ -241,17 +258,32 @@ with tab_macro:
         else:
             st.info("Nenhuma análise do Banco Central encontrada para este país.")
 
+        st.markdown("---")
+
+        # --- PAINEL CONSENSO DAS GESTORAS ---
+        st.subheader("Consenso das Gestoras")
+        agregado = consenso.agregado('pais', pais_selecionado_id)
+        if agregado:
+            nomes = snapshot.nomes()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Score Líquido", f"{agregado.score_liquido:+.2f}", help="Média das visões vigentes: Overweight = 1, Neutral = 0, Underweight = -1")
+            col2.metric("Dispersão", f"{agregado.dispersao:.2f}", help="Desvio padrão das visões vigentes")
+            col3.metric("Gestoras", agregado.n_gestoras)
+            if agregado.ultima_mudanca:
+                mudanca = agregado.ultima_mudanca
+                col4.metric("Última Mudança", mudanca.nova, help=f"{nomes.get(('gestora', mudanca.gestora_id), 'N/A')}: {mudanca.anterior} → {mudanca.nova}")
+        else:
+            st.info("Nenhuma gestora com visão registrada para este país.")
+
         st.markdown("---")
 
          # --- NOVO: PAINEL TIMELINE ---
         st.subheader("Timeline de Visões")
         # Busca dados apenas do tipo 'Macro' para a timeline
-        timeline_response = supabase.table('analises').select(
-            'data_publicacao, titulo, visao, gestoras(nome)'
-        ).eq('pais_id', pais_selecionado_id).eq('tipo_analise', 'Macro').neq('visao', 'N/A').execute()
+        timeline_data = corpus.linhas(corpus.filtrar('Macro', visao_excluida='N/A', pais_id=pais_selecionado_id))
 
-        if timeline_response.data:
-            timeline_chart = create_timeline_chart(timeline_response.data)
+        if timeline_data:
+            timeline_chart = create_timeline_chart(timeline_data)
             if timeline_chart:
                 st.altair_chart(timeline_chart, use_container_width=True)
         else:
@@ -261,10 +293,10 @@ with tab_macro:
         
         # --- PAINEL VISÃO DAS GESTORAS ---
         st.subheader("Visão das Gestoras")
-        gestoras_response = supabase.table('analises').select('*, gestoras(nome)').eq('pais_id', pais_selecionado_id).eq('tipo_analise', 'Macro').execute()
+        analises_gestoras = corpus.linhas(corpus.filtrar('Macro', pais_id=pais_selecionado_id))
         
-        if gestoras_response.data:
-            for analise in gestoras_response.data:
+        if analises_gestoras:
+            for analise in analises_gestoras:
                 nome_gestora = analise['gestoras']['nome'] if analise.get('gestoras') else "N/A"
                 with st.expander(f"**{analise['titulo']}** (Visão: {nome_gestora})"):
                     st.caption(f"Visão da Gestora: **{analise['visao']}**")
@@ -275,10 +307,10 @@ with tab_macro:
 
         # --- NOVO: PAINEL TREND THESIS ---
         st.subheader("Teses de Investimento (Macro)")
-        tese_response = supabase.table('analises').select('*, gestoras(nome)').eq('pais_id', pais_selecionado_id).eq('tipo_analise', 'Tese').execute()
+        teses = corpus.linhas(corpus.filtrar('Tese', pais_id=pais_selecionado_id))
         
-        if tese_response.data:
-            for tese in tese_response.data:
+        if teses:
+            for tese in teses:
                 nome_gestora = tese['gestoras']['nome'] if tese.get('gestoras') else "N/A"
                 with st.container(border=True):
                     st.write(f"**{tese['titulo']}**")
@@ -290,6 +322,15 @@ with tab_macro:
 # --- OUTRAS ABAS (EM CONSTRUÇÃO) ---
 with tab_assets:
     st.header("📊 Análise por Classe de Ativo")
+
+    with st.expander("🗺️ Visão Geral: Classe de Ativo × País", expanded=False):
+        nomes_classes = {item['id']: item['nome'] for item in snapshot.classes_de_ativos}
+        nomes_paises = {item['id']: item['nome'] for item in snapshot.paises}
+        heatmap_chart = create_heatmap_chart(heatmaps.classe_pais.para_dataframe(nomes_classes, nomes_paises), 'Classe de Ativo', 'País')
+        if heatmap_chart:
+            st.altair_chart(heatmap_chart, use_container_width=True)
+        else:
+            st.info("Ainda não há análises do tipo 'Asset' para montar a visão geral.")
     paises_map_assets = get_paises()
     classes_map_assets = get_classes_de_ativos()
     
@@ -303,10 +344,10 @@ with tab_assets:
         pais_id = paises_map_assets[pais_selecionado_nome]
         classe_id = classes_map_assets[classe_selecionada_nome]
 
-        response = supabase.table('analises').select('*, gestoras(nome)').eq('pais_id', pais_id).eq('classe_de_ativo_id', classe_id).in_('tipo_analise', ['Asset', 'Tese', 'Driver']).execute()
+        analises = corpus.linhas(corpus.filtrar(['Asset', 'Tese', 'Driver'], pais_id=pais_id, classe_de_ativo_id=classe_id))
         
         st.markdown("---")
-        display_analises(response.data)
+        display_analises(analises)
 
 # --- NOVA: ABA MICROASSETS VIEW ---
 with tab_micro:
@@ -328,13 +369,22 @@ with tab_micro:
         pais_id = paises_map_micro[pais_selecionado_nome_micro]
         subclasse_id = subclasses_map_micro[subclasse_selecionada_nome_micro]
 
-        response = supabase.table('analises').select('*, gestoras(nome)').eq('pais_id', pais_id).eq('subclasse_de_ativo_id', subclasse_id).in_('tipo_analise', ['MicroAsset', 'Tese', 'Driver']).execute()
+        analises = corpus.linhas(corpus.filtrar(['MicroAsset', 'Tese', 'Driver'], pais_id=pais_id, subclasse_de_ativo_id=subclasse_id))
 
         st.markdown("---")
-        display_analises(response.data)
+        display_analises(analises)
 
 with tab_thematic:
     st.header("🎨 Análise de Teses Temáticas")
+
+    with st.expander("🗺️ Visão Geral: Tema × Gestora", expanded=False):
+        nomes_temas = {item['id']: item['nome'] for item in snapshot.temas}
+        nomes_gestoras = {item['id']: item['nome'] for item in snapshot.gestoras}
+        heatmap_chart = create_heatmap_chart(heatmaps.tema_gestora.para_dataframe(nomes_temas, nomes_gestoras), 'Tema', 'Gestora')
+        if heatmap_chart:
+            st.altair_chart(heatmap_chart, use_container_width=True)
+        else:
+            st.info("Ainda não há análises do tipo 'Thematic' para montar a visão geral.")
     temas_map = get_temas()
     
     tema_selecionado_nome = st.selectbox(
@@ -346,16 +396,39 @@ with tab_thematic:
     if tema_selecionado_nome and tema_selecionado_nome != "--Selecione--":
         tema_id = temas_map[tema_selecionado_nome]
         
-        response = supabase.table('analises').select(
-            '*, gestoras(nome)'
-        ).eq(
-            'tema_id', tema_id
-        ).eq(
-            'tipo_analise', 'Thematic'
-        ).execute()
+        analises = corpus.linhas(corpus.filtrar('Thematic', tema_id=tema_id))
 
         st.markdown("---")
-        display_analises(response.data)
+        display_analises(analises)
+
+with tab_calendario:
+    st.header("🗓️ Calendário Econômico")
+
+    paises_calendario = calendario.paises()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        horizonte = st.selectbox("Período:", options=[7, 30, 90], format_func=lambda d: f"Próximos {d} dias", key="calendario_horizonte")
+    with col2:
+        paises_filtro = st.multiselect(
+            "Países:", options=list(paises_calendario.keys()),
+            format_func=lambda p: " ".join(paises_calendario[p]), key="calendario_paises"
+        )
+    with col3:
+        importancias_filtro = st.multiselect("Importância:", options=calendario.importancias(), key="calendario_importancia")
+
+    eventos = calendario.proximos(horizonte, paises=paises_filtro, importancias=importancias_filtro)
+
+    st.markdown("---")
+    if eventos:
+        df_eventos = pd.DataFrame([{
+            'Data': evento.data.strftime('%d/%m/%Y'),
+            'Evento': evento.nome,
+            'País': f"{evento.pais_nome} {evento.pais_emoji}",
+            'Importância': evento.importancia,
+        } for evento in eventos])
+        st.dataframe(df_eventos, hide_index=True, use_container_width=True)
+    else:
+        st.info("Nenhum evento encontrado para os filtros selecionados.")
 
 with tab_report:
     st.header("📄 Gerador de Relatórios Personalizados")
@@ -376,21 +449,21 @@ with tab_report:
 
             if selected_paises:
                 pais_ids = [paises_map[p] for p in selected_paises]
-                macro_response = supabase.table('analises').select('*, gestoras(nome)').in_('pais_id', pais_ids).eq('tipo_analise', 'Macro').execute()
-                if macro_response.data:
-                    report_data['Analises Macroeconomicas'] = macro_response.data
+                analises_macro = corpus.linhas(corpus.filtrar('Macro', pais_id=pais_ids))
+                if analises_macro:
+                    report_data['Analises Macroeconomicas'] = analises_macro
             
             if selected_classes:
                 classe_ids = [classes_map[c] for c in selected_classes]
-                asset_response = supabase.table('analises').select('*, gestoras(nome)').in_('classe_de_ativo_id', classe_ids).eq('tipo_analise', 'Asset').execute()
-                if asset_response.data:
-                    report_data['Analises por Classe de Ativo'] = asset_response.data
+                analises_asset = corpus.linhas(corpus.filtrar('Asset', classe_de_ativo_id=classe_ids))
+                if analises_asset:
+                    report_data['Analises por Classe de Ativo'] = analises_asset
 
             if selected_temas:
                 tema_ids = [temas_map[t] for t in selected_temas]
-                thematic_response = supabase.table('analises').select('*, gestoras(nome)').in_('tema_id', tema_ids).eq('tipo_analise', 'Thematic').execute()
-                if thematic_response.data:
-                    report_data['Analises Tematicas'] = thematic_response.data
+                analises_tematicas = corpus.linhas(corpus.filtrar('Thematic', tema_id=tema_ids))
+                if analises_tematicas:
+                    report_data['Analises Tematicas'] = analises_tematicas
             
             pdf_output = generate_pdf_report(report_data)
 
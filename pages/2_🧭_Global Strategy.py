@@ -2,6 +2,8 @@ import streamlit as st
 from supabase import create_client, Client
 import pandas as pd
 import plotly.express as px
+from services.alocacoes import carregar_alocacao_perfil
+from services.coalescencia import get_consultas
 
 # --- CONEXÃO COM O SUPABASE ---
 @st.cache_resource
@@ -11,6 +13,7 @@ def init_connection() -> Client:
     return create_client(url, key)
 
 supabase = init_connection()
+consultas = get_consultas(supabase)
 
 # --- INTERFACE ---
 st.set_page_config(page_title="Global Strategy", page_icon="🧭", layout="wide")
@@ -63,18 +66,15 @@ if st.button("Descobrir Meu Perfil e Estratégia"):
     st.header(f"Seu Perfil de Investidor: **{perfil_final}**")
     
     # Busca a alocação modelo para o perfil determinado
-    perfil_id_response = supabase.table('perfis_de_risco').select('id').eq('nome', perfil_final).execute()
+    perfis = consultas.consultar('perfis_de_risco', 'id', filtros=[('eq', 'nome', perfil_final)])
     
-    if perfil_id_response.data:
-        perfil_id = perfil_id_response.data[0]['id']
-        alocacao_response = supabase.table('alocacoes_modelo').select('id, nome_estrategia').eq('perfil_de_risco_id', perfil_id).single().execute()
+    if perfis:
+        perfil_id = perfis[0]['id']
+        alocacao, componentes = carregar_alocacao_perfil(supabase, perfil_id)
         
-        if alocacao_response.data:
-            alocacao = alocacao_response.data
-            componentes_response = supabase.table('componentes_alocacao').select('*').eq('alocacao_modelo_id', alocacao['id']).execute()
-            
-            if componentes_response.data:
-                df_componentes = pd.DataFrame(componentes_response.data)
+        if alocacao:
+            if componentes:
+                df_componentes = pd.DataFrame(componentes)
                 
                 st.subheader(f"Estratégia de Alocação Sugerida: {alocacao['nome_estrategia']}")
                 
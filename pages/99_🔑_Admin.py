@@ -1,6 +1,10 @@
 import streamlit as st
 from supabase import create_client, Client
 import pandas as pd
+from services.alocacoes import COLUNAS_COMPONENTE, carregar_alocacao_perfil, diff_componentes, salvar_alocacao
+from services.coalescencia import get_consultas
+from services.paginacao import FiltrosAnalise, IndiceReferencia, buscar_pagina_analises
+from services.snapshots import get_refresher
 
 # --- INICIALIZAÇÃO DA CONEXÃO ---
 @st.cache_resource
@@ -10,36 +14,47 @@ def init_connection() -> Client:
     return create_client(url, key)
 
 supabase = init_connection()
+refresher = get_refresher(supabase)
+consultas = get_consultas(supabase)
 
 # --- FUNÇÕES DE CONSULTA AO BANCO ---
-# Adicionamos 'order' para que as listas apareçam sempre na mesma ordem
-@st.cache_data(ttl=60)
-def get_all_data(table_name):
-    response = supabase.table(table_name).select('id, nome').order('nome').execute()
-    return {item['nome']: item['id'] for item in response.data}
+def limpar_caches():
+    """Invalida os caches locais e publica de imediato uma nova fotografia partilhada."""
+    st.cache_data.clear()
+    refresher.atualizar()
+
+# Índices id -> posição dos seletores, calculados uma vez por versão das tabelas de referência
+@st.cache_resource(max_entries=2)
+def get_indices_referencia(_snapshot, versao_referencias):
+    return {
+        'paises': IndiceReferencia.from_rows(_snapshot.paises),
+        'gestoras': IndiceReferencia.from_rows(_snapshot.gestoras),
+        'classes_de_ativos': IndiceReferencia.from_rows(_snapshot.classes_de_ativos),
+        'temas': IndiceReferencia.from_rows(_snapshot.temas),
+    }
 
 @st.cache_data(ttl=60)
-def get_all_analyses():
-    response = supabase.table('analises').select('id, titulo').order('titulo').execute()
-    return {"--- Criar Nova Análise ---": None, **{item['titulo']: item['id'] for item in response.data}}
+def get_pagina_analises(filtros, cursor):
+    return buscar_pagina_analises(supabase, filtros, cursor, limite=ANALISES_POR_PAGINA)
+
+TIPOS_ANALISE = ["Macro", "Visão BC", "Tese", "Asset", "MicroAsset", "Thematic"]
+ANALISES_POR_PAGINA = 25
 
 @st.cache_data(ttl=60)
 def get_full_analysis_details(analysis_id):
     if not analysis_id:
         return None
-    response = supabase.table('analises').select('*').eq('id', analysis_id).single().execute()
-    return response.data
+    return consultas.consultar('analises', filtros=[('eq', 'id', analysis_id)], limite=1)[0]
 
 @st.cache_data(ttl=60)
 def get_all_indicators():
-    response = supabase.table('indicadores_economicos').select('id, nome_indicador, paises(nome)').order('nome_indicador').execute()
-    return {"--- Criar Novo Indicador ---": None, **{f"{item['paises']['nome']} - {item['nome_indicador']}": item['id'] for item in response.data}}
+    indicadores = consultas.consultar('indicadores_economicos', 'id, nome_indicador, paises(nome)', ordem=[('nome_indicador', False)])
+    return {"--- Criar Novo Indicador ---": None, **{f"{item['paises']['nome']} - {item['nome_indicador']}": item['id'] for item in indicadores}}
 
 @st.cache_data(ttl=60)
 def get_full_indicator_details(indicator_id):
     if not indicator_id: return None
-    response = supabase.table('indicadores_economicos').select('*').eq('id', indicator_id).single().execute()
-    return response.data
+    return consultas.consultar('indicadores_economicos', filtros=[('eq', 'id', indicator_id)], limite=1)[0]
 
 @st.cache_data(ttl=60)
 def get_all_themes():
@@ -57,12 +72,16 @@ password = st.text_input("Digite a senha para acessar o painel", type="password"
 if password == st.secrets["ADMIN_PASSWORD"]:
     st.success("Acesso liberado!")
 
-    # Carrega os dados para os dropdowns
-    gestoras_map = get_all_data('gestoras')
-    paises_map = get_all_data('paises')
-    classes_map = get_all_data('classes_de_ativos')
-    temas_map = get_all_data('temas')
-    analyses_map = get_all_analyses()
+    with st.expander("Diagnóstico de consultas"):
+        estatisticas = consultas.estatisticas()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Chamadas", estatisticas['chamadas'])
+        col2.metric("Idas ao banco", estatisticas['execucoes'])
+        col3.metric("Deduplicadas", estatisticas['deduplicadas'])
+        col4.metric("Em voo", estatisticas['em_voo'])
+
+    # Carrega os índices para os dropdowns
+    indices = get_indices_referencia(refresher.snapshot, refresher.snapshot.versao_referencias)
 
     tab_analise, tab_indicadores, tab_temas, tab_alertas, tab_alocacoes = st.tabs([
         "Gerenciar Análises", "Gerenciar Indicadores", "Gerenciar Temas", 
@@ -71,41 +90,72 @@ if password == st.secrets["ADMIN_PASSWORD"]:
 
     with tab_analise:
         st.header("Gestão de Análises")
-
-        selected_analysis_title = st.selectbox(
+        if 'aviso_alertas' in st.session_state:
+            st.info(st.session_state.pop('aviso_alertas'))
+
+        # --- FILTROS E PAGINAÇÃO DO SELETOR ---
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            filtro_tipo = st.selectbox("Tipo", options=[None] + TIPOS_ANALISE, format_func=lambda t: t or "Todos", key="picker_tipo")
+        with col2:
+            filtro_pais = st.selectbox("País", options=(None,) + indices['paises'].ids, format_func=lambda i: indices['paises'].nome(i) if i else "Todos", key="picker_pais")
+        with col3:
+            filtro_gestora = st.selectbox("Gestora", options=(None,) + indices['gestoras'].ids, format_func=lambda i: indices['gestoras'].nome(i) if i else "Todas", key="picker_gestora")
+        with col4:
+            filtro_datas = st.date_input("Publicada entre", value=(), key="picker_datas")
+        filtro_titulo = st.text_input("Título contém", key="picker_titulo")
+
+        filtros = FiltrosAnalise(
+            tipo_analise=filtro_tipo, pais_id=filtro_pais, gestora_id=filtro_gestora,
+            data_inicio=filtro_datas[0].isoformat() if len(filtro_datas) > 0 else None,
+            data_fim=filtro_datas[1].isoformat() if len(filtro_datas) > 1 else None,
+            titulo=filtro_titulo.strip(),
+        )
+        # Pilha de cursores das páginas já visitadas; recomeça quando os filtros mudam
+        if st.session_state.get('picker_filtros') != filtros:
+            st.session_state.picker_filtros = filtros
+            st.session_state.picker_cursores = [None]
+        cursores = st.session_state.picker_cursores
+        pagina, proximo_cursor = get_pagina_analises(filtros, cursores[-1])
+        analises_pagina = {item['id']: item for item in pagina}
+
+        def format_analise(analise_id):
+            if analise_id is None:
+                return "--- Criar Nova Análise ---"
+            item = analises_pagina[analise_id]
+            gestora = item['gestoras']['nome'] if item.get('gestoras') else "Interna"
+            data = str(item.get('data_publicacao') or '')[:10]
+            return f"{item['titulo']} — {gestora}, {data} (#{analise_id})"
+
+        selected_analysis_id = st.selectbox(
             "Selecione uma análise para editar ou escolha 'Criar Nova Análise'",
-            options=list(analyses_map.keys())
+            options=[None] + list(analises_pagina.keys()),
+            format_func=format_analise,
+            key="picker_analise"
         )
-        
-        selected_analysis_id = analyses_map[selected_analysis_title]
+
+        col_anterior, col_pagina, col_proxima = st.columns([1, 2, 1])
+        if col_anterior.button("◀ Anterior", disabled=len(cursores) == 1):
+            cursores.pop()
+            st.rerun()
+        col_pagina.caption(f"Página {len(cursores)}")
+        if col_proxima.button("Próxima ▶", disabled=proximo_cursor is None):
+            cursores.append(proximo_cursor)
+            st.rerun()
         
         # Carrega os dados da análise selecionada se houver uma
         analysis_data = get_full_analysis_details(selected_analysis_id) if selected_analysis_id else {}
-
-        # Função para encontrar o índice de um valor num dicionário de mapeamento
-        def get_index(value_id, data_map):
-            if value_id is None: return 0
-            try:
-                # Cria um dicionário reverso de ID para Nome
-                reverse_map = {v: k for k, v in data_map.items()}
-                # Encontra a chave (nome) correspondente ao ID
-                key = reverse_map.get(value_id)
-                # Retorna o índice da chave na lista de opções
-                return list(data_map.keys()).index(key)
-            except (ValueError, KeyError):
-                return 0 # Retorna 0 (primeira opção) se não encontrar
+        selected_analysis_title = analysis_data.get('titulo', '')
 
         with st.form("analysis_form"):
             titulo = st.text_input("Título da Análise", value=analysis_data.get('titulo', ''))
             
             # Preenche os seletores com os valores existentes
-            tipo_analise = st.selectbox("Tipo de Análise", options=["Macro", "Visão BC", "Tese", "Asset", "MicroAsset", "Thematic"], index=["Macro", "Visão BC", "Tese", "Asset", "MicroAsset", "Thematic"].index(analysis_data.get('tipo_analise', 'Macro')))
+            tipo_analise = st.selectbox("Tipo de Análise", options=TIPOS_ANALISE, index=TIPOS_ANALISE.index(analysis_data.get('tipo_analise', 'Macro')))
             
-            pais_idx = get_index(analysis_data.get('pais_id'), paises_map)
-            pais_nome = st.selectbox("País", options=list(paises_map.keys()), index=pais_idx)
+            pais_id = st.selectbox("País", options=indices['paises'].ids, format_func=indices['paises'].nome, index=indices['paises'].indice(analysis_data.get('pais_id')))
             
-            gestora_idx = get_index(analysis_data.get('gestora_id'), gestoras_map)
-            gestora_nome = st.selectbox("Gestora", options=list(gestoras_map.keys()), index=gestora_idx)
+            gestora_id = st.selectbox("Gestora", options=indices['gestoras'].ids, format_func=indices['gestoras'].nome, index=indices['gestoras'].indice(analysis_data.get('gestora_id')))
             
             # (Campos para classe, subclasse e tema seriam adicionados aqui com lógica similar)
 
@@ -119,19 +169,27 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                 form_data = {
                     'titulo': titulo, 'tipo_analise': tipo_analise, 'visao': visao,
                     'resumo': resumo, 'texto_completo': texto_completo,
-                    'pais_id': paises_map.get(pais_nome),
-                    'gestora_id': gestoras_map.get(gestora_nome)
+                    'pais_id': pais_id,
+                    'gestora_id': gestora_id
                 }
                 
                 try:
                     if selected_analysis_id: # Se um ID existe, é uma ATUALIZAÇÃO (UPDATE)
-                        supabase.table('analises').update(form_data).eq('id', selected_analysis_id).execute()
+                        salvas = supabase.table('analises').update(form_data).eq('id', selected_analysis_id).execute().data
                         st.success(f"Análise '{titulo}' atualizada com sucesso!")
                     else: # Se não há ID, é uma CRIAÇÃO (INSERT)
-                        supabase.table('analises').insert(form_data).execute()
+                        salvas = supabase.table('analises').insert(form_data).execute().data
                         st.success(f"Análise '{titulo}' criada com sucesso!")
+
+                    # Atualiza o consenso; os alertas de 'Mudança de Visão' são gravados pelo refresher
+                    mudancas = [m for analise in salvas for m in refresher.consenso.aplicar(analise)]
+                    refresher.corpus.recarregar_ids([analise['id'] for analise in salvas])
                     
-                    st.cache_data.clear() # Limpa o cache para recarregar as listas
+                    limpar_caches() # Limpa o cache para recarregar as listas
+                    if mudancas:
+                        # A atualização acima já grava os alertas; se falhar, ficam na fila para o próximo ciclo
+                        estado = "publicado(s)" if refresher.ultimo_erro is None else "na fila para publicação"
+                        st.session_state.aviso_alertas = f"{len(mudancas)} alerta(s) de mudança de visão {estado}."
                     st.rerun() # Força a recarga da página para mostrar as atualizações
                 except Exception as e:
                     st.error(f"Erro ao salvar: {e}")
@@ -143,8 +201,10 @@ if password == st.secrets["ADMIN_PASSWORD"]:
             if st.button(f"Apagar Análise '{selected_analysis_title}'", type="primary"):
                 try:
                     supabase.table('analises').delete().eq('id', selected_analysis_id).execute()
+                    refresher.consenso.remover(selected_analysis_id)
+                    refresher.corpus.recarregar_ids([selected_analysis_id])
                     st.success("Análise apagada com sucesso!")
-                    st.cache_data.clear()
+                    limpar_caches()
                     st.rerun()
                 except Exception as e:
                     st.error(f"Erro ao apagar: {e}")
@@ -153,7 +213,6 @@ if password == st.secrets["ADMIN_PASSWORD"]:
         st.header("Gerenciar Indicadores Econômicos")
         
         indicators_map = get_all_indicators()
-        paises_map = get_all_data('paises')
 
         selected_indicator_label = st.selectbox(
             "Selecione um indicador para editar ou escolha 'Criar Novo Indicador'",
@@ -164,13 +223,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
         indicator_data = get_full_indicator_details(selected_indicator_id) if selected_indicator_id else {}
 
         with st.form("indicadores_form", clear_on_submit=False):
-            def get_pais_index(pais_id):
-                if not pais_id: return 0
-                reverse_map = {v: k for k, v in paises_map.items()}
-                key = reverse_map.get(pais_id)
-                return list(paises_map.keys()).index(key) if key in paises_map else 0
-
-            pais_nome = st.selectbox("País do Indicador", options=list(paises_map.keys()), index=get_pais_index(indicator_data.get('pais_id')))
+            pais_id = st.selectbox("País do Indicador", options=indices['paises'].ids, format_func=indices['paises'].nome, index=indices['paises'].indice(indicator_data.get('pais_id')))
             nome_indicador = st.text_input("Nome do Indicador", value=indicator_data.get('nome_indicador', ''))
             valor_atual = st.text_input("Valor Atual", value=indicator_data.get('valor_atual', ''))
             data_referencia = st.text_input("Data de Referência", value=indicator_data.get('data_referencia', ''))
@@ -181,7 +234,6 @@ if password == st.secrets["ADMIN_PASSWORD"]:
             
             submitted_indicador = st.form_submit_button("Salvar Indicador")
             if submitted_indicador:
-                pais_id = paises_map[pais_nome]
                 form_data = {
                     'pais_id': pais_id, 'nome_indicador': nome_indicador,
                     'valor_atual': valor_atual, 'data_referencia': data_referencia,
@@ -194,7 +246,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                     else:
                         supabase.table('indicadores_economicos').insert(form_data).execute()
                         st.success(f"Indicador '{nome_indicador}' criado com sucesso!")
-                    st.cache_data.clear()
+                    limpar_caches()
                     st.rerun()
                 except Exception as e:
                     st.error(f"Erro ao salvar indicador: {e}")
@@ -204,7 +256,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                 try:
                     supabase.table('indicadores_economicos').delete().eq('id', selected_indicator_id).execute()
                     st.success("Indicador apagado com sucesso!")
-                    st.cache_data.clear()
+                    limpar_caches()
                     st.rerun()
                 except Exception as e:
                     st.error(f"Erro ao apagar: {e}")
@@ -232,7 +284,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                     else:
                         supabase.table('temas').insert({'nome': nome_tema}).execute()
                         st.success(f"Tema '{nome_tema}' criado com sucesso!")
-                    st.cache_data.clear()
+                    limpar_caches()
                     st.rerun()
                 except Exception as e:
                     st.error(f"Erro ao salvar tema: {e}")
@@ -242,7 +294,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                 try:
                     supabase.table('temas').delete().eq('id', selected_theme_id).execute()
                     st.success("Tema apagado com sucesso!")
-                    st.cache_data.clear()
+                    limpar_caches()
                     st.rerun()
                 except Exception as e:
                     st.error(f"Erro ao apagar: {e}")
@@ -250,6 +302,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
     with tab_alertas:
         st.header("Gerenciar Alertas para o Hub")
         st.info("Crie alertas que aparecerão em destaque na página principal do Hub.")
+        st.caption("Os alertas de 'Mudança de Visão' são gerados automaticamente quando uma análise altera a visão de uma gestora.")
 
         with st.form("alertas_form", clear_on_submit=True):
             titulo = st.text_input("Título do Alerta")
@@ -267,6 +320,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                 }
                 try:
                     supabase.table('alertas').insert(form_data).execute()
+                    refresher.atualizar()
                     st.success(f"Alerta '{titulo}' criado com sucesso!")
                 except Exception as e:
                     st.error(f"Erro ao salvar o alerta: {e}")
@@ -283,18 +337,15 @@ if password == st.secrets["ADMIN_PASSWORD"]:
         selected_perfil_nome = st.selectbox("Selecione o Perfil de Risco para editar a alocação:", options=perfis_map.keys())
         selected_perfil_id = perfis_map[selected_perfil_nome]
 
-        # Verifica se já existe uma alocação para este perfil
-        response = supabase.table('alocacoes_modelo').select('*').eq('perfil_de_risco_id', selected_perfil_id).limit(1).execute()
-        alocacao_existente = response.data[0] if response.data else None
+        # Verifica se já existe uma alocação para este perfil (mesmo cache usado pelo Global Strategy)
+        alocacao_existente, componentes_existentes = carregar_alocacao_perfil(supabase, selected_perfil_id)
         
         if alocacao_existente:
             st.write(f"Editando: **{alocacao_existente['nome_estrategia']}**")
-            # Carrega componentes existentes
-            componentes_existentes = supabase.table('componentes_alocacao').select('*').eq('alocacao_modelo_id', alocacao_existente['id']).execute().data
-            df_componentes = pd.DataFrame(componentes_existentes)
         else:
             st.warning(f"Nenhuma alocação encontrada para o perfil '{selected_perfil_nome}'. Crie uma abaixo.")
-            df_componentes = pd.DataFrame(columns=['nome_ativo', 'ticker_exemplo', 'percentual', 'justificativa'])
+        # O id fica oculto no editor e identifica as linhas existentes no cálculo das diferenças
+        df_componentes = pd.DataFrame(componentes_existentes, columns=['id', *COLUNAS_COMPONENTE])
 
         with st.form("alocacao_form"):
             nome_estrategia = st.text_input("Nome da Estratégia", value=alocacao_existente['nome_estrategia'] if alocacao_existente else f"Alocação {selected_perfil_nome} Global")
@@ -302,7 +353,7 @@ if password == st.secrets["ADMIN_PASSWORD"]:
             st.write("Componentes da Alocação:")
             
             # Usar o editor de dados do Streamlit para uma experiência de tabela
-            edited_df = st.data_editor(df_componentes[['nome_ativo', 'ticker_exemplo', 'percentual', 'justificativa']], num_rows="dynamic", key="alocacao_editor")
+            edited_df = st.data_editor(df_componentes, num_rows="dynamic", column_config={"id": None}, hide_index=True, key="alocacao_editor")
 
             submitted = st.form_submit_button("Salvar Alocação")
             if submitted:
@@ -310,27 +361,21 @@ if password == st.secrets["ADMIN_PASSWORD"]:
                 if not (99.9 <= total_percentual <= 100.1):
                     st.error(f"A soma dos percentuais deve ser 100%. Soma atual: {total_percentual:.2f}%")
                 else:
-                    try:
-                        # Se a alocação não existe, cria-a primeiro
-                        if not alocacao_existente:
-                            alocacao_existente = supabase.table('alocacoes_modelo').insert({
-                                'perfil_de_risco_id': selected_perfil_id,
-                                'nome_estrategia': nome_estrategia
-                            }).execute().data[0]
-                        
-                        alocacao_id = alocacao_existente['id']
-                        # Apaga os componentes antigos
-                        supabase.table('componentes_alocacao').delete().eq('alocacao_modelo_id', alocacao_id).execute()
-                        
-                        # Insere os novos componentes
-                        novos_componentes = edited_df.to_dict('records')
-                        for comp in novos_componentes:
-                            comp['alocacao_modelo_id'] = alocacao_id
-                        
-                        supabase.table('componentes_alocacao').insert(novos_componentes).execute()
-                        st.success(f"Alocação para o perfil '{selected_perfil_nome}' salva com sucesso!")
-                    except Exception as e:
-                        st.error(f"Erro ao salvar a alocação: {e}") 
+                    diff = diff_componentes(componentes_existentes, edited_df.to_dict('records'))
+                    nome_alterado = not alocacao_existente or nome_estrategia != alocacao_existente['nome_estrategia']
+                    if not (diff or nome_alterado):
+                        st.info("Nenhuma alteração para salvar.")
+                    else:
+                        try:
+                            # Alocação e componentes são gravados numa única transação no banco
+                            salvar_alocacao(supabase, selected_perfil_id, nome_estrategia, diff)
+                            carregar_alocacao_perfil.clear(supabase, selected_perfil_id)
+                            st.success(
+                                f"Alocação para o perfil '{selected_perfil_nome}' salva com sucesso! "
+                                f"({len(diff.inserir)} inserido(s), {len(diff.atualizar)} atualizado(s), {len(diff.apagar)} apagado(s))"
+                            )
+                        except Exception as e:
+                            st.error(f"Erro ao salvar a alocação: {e}") 
 
 elif password:
     st.error("Senha incorreta. Tente novamente.")
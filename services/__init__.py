@@ -0,0 +1 @@
+"""Serviços compartilhados entre as páginas da Plataforma Offshore."""
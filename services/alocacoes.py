@@ -0,0 +1,95 @@
+"""Leitura em cache e gravação atômica, por diferenças, das alocações modelo."""
+import math
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+COLUNAS_COMPONENTE = ('nome_ativo', 'ticker_exemplo', 'percentual', 'justificativa')
+RPC_SALVAR = 'salvar_componentes_alocacao'
+
+
+# --- LEITURA ---
+@st.cache_data(ttl=600)
+def carregar_alocacao_perfil(_client, perfil_id):
+    """Alocação modelo de um perfil e os seus componentes, como (alocacao, componentes).
+
+    Partilhada entre o Global Strategy e o Admin; depois de gravar, o Admin limpa
+    apenas a entrada do perfil alterado com `carregar_alocacao_perfil.clear(client, perfil_id)`.
+    """
+    alocacoes = _client.table('alocacoes_modelo').select('id, nome_estrategia').eq('perfil_de_risco_id', perfil_id).limit(1).execute().data
+    if not alocacoes:
+        return None, []
+    alocacao = alocacoes[0]
+    componentes = _client.table('componentes_alocacao').select('*').eq('alocacao_modelo_id', alocacao['id']).order('id').execute().data
+    return alocacao, componentes
+
+
+# --- DIFERENÇAS ---
+def _vazio(valor):
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def _normalizar(row):
+    componente = {}
+    for coluna in COLUNAS_COMPONENTE:
+        valor = row.get(coluna)
+        if _vazio(valor):
+            valor = None
+        elif coluna == 'percentual':
+            valor = float(valor)
+        else:
+            valor = str(valor)
+        componente[coluna] = valor
+    return componente
+
+
+@dataclass
+class DiffAlocacao:
+    inserir: list = field(default_factory=list)
+    atualizar: list = field(default_factory=list)
+    apagar: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.inserir or self.atualizar or self.apagar)
+
+
+def diff_componentes(originais, editados):
+    """Compara as linhas carregadas com a saída do `st.data_editor`.
+
+    `editados` são registros com a coluna `id` (vazia nas linhas novas). Linhas
+    completamente em branco são ignoradas; as atualizações levam só as colunas alteradas.
+    """
+    por_id = {row['id']: _normalizar(row) for row in originais}
+    diff = DiffAlocacao()
+    vistos = set()
+    for row in editados:
+        componente = _normalizar(row)
+        if all(v is None for v in componente.values()):
+            continue
+        componente_id = None if _vazio(row.get('id')) else int(row['id'])
+        if componente_id not in por_id:
+            diff.inserir.append(componente)
+            continue
+        vistos.add(componente_id)
+        alterado = {k: v for k, v in componente.items() if v != por_id[componente_id][k]}
+        if alterado:
+            diff.atualizar.append({'id': componente_id, **alterado})
+    diff.apagar = [componente_id for componente_id in por_id if componente_id not in vistos]
+    return diff
+
+
+# --- GRAVAÇÃO ---
+def salvar_alocacao(client, perfil_id, nome_estrategia, diff):
+    """Aplica a alocação e as diferenças dos componentes numa única chamada transacional.
+
+    A função `salvar_componentes_alocacao` (sql/salvar_componentes_alocacao.sql) cria ou
+    renomeia a alocação do perfil e aplica inserções, atualizações e exclusões na mesma
+    transação: se algo falhar, nenhuma alteração fica gravada. Devolve o id da alocação.
+    """
+    return client.rpc(RPC_SALVAR, {
+        'p_perfil_id': perfil_id,
+        'p_nome_estrategia': nome_estrategia,
+        'p_inserir': diff.inserir,
+        'p_atualizar': diff.atualizar,
+        'p_apagar': diff.apagar,
+    }).execute().data
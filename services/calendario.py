@@ -0,0 +1,167 @@
+"""Índice em memória dos próximos eventos do calendário econômico."""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from heapq import merge
+
+from services.lotes import buscar_em_lotes
+
+COLUNAS_EVENTO = 'id, data_evento, nome_evento, importancia, pais_id, paises(nome, emoji_bandeira)'
+
+
+@dataclass(frozen=True, order=True)
+class Evento:
+    data: date
+    id: int
+    nome: str
+    importancia: str
+    pais_id: int | None
+    pais_nome: str
+    pais_emoji: str
+
+    @classmethod
+    def from_row(cls, row):
+        pais = row.get('paises') or {}
+        return cls(
+            data=_to_date(row['data_evento']),
+            id=row['id'],
+            nome=row.get('nome_evento') or '',
+            importancia=row.get('importancia') or 'N/A',
+            pais_id=row.get('pais_id'),
+            pais_nome=pais.get('nome', 'Global'),
+            pais_emoji=pais.get('emoji_bandeira', '🌍'),
+        )
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class _Indice:
+    """Fotografia imutável dos eventos, ordenada por data e indexada por país e importância."""
+
+    def __init__(self, eventos):
+        self.eventos = tuple(eventos)
+        self.datas = tuple(e.data for e in self.eventos)
+        self.por_pais = self._agrupar(lambda e: e.pais_id)
+        self.por_importancia = self._agrupar(lambda e: e.importancia)
+
+    def _agrupar(self, chave):
+        grupos = {}
+        for evento in self.eventos:
+            grupos.setdefault(chave(evento), []).append(evento)
+        return {k: (tuple(e.data for e in v), tuple(v)) for k, v in grupos.items()}
+
+    @staticmethod
+    def fatia(datas, eventos, inicio, fim):
+        return eventos[bisect_left(datas, inicio):bisect_right(datas, fim)]
+
+
+class CalendarioEventos:
+    """Mantém os eventos de `eventos_calendario` ordenados em memória.
+
+    A carga inicial busca a janela [hoje, hoje + horizonte_dias]; as atualizações
+    seguintes trazem apenas os eventos com id maior que o último visto e descartam
+    os eventos que já passaram. Uma recarga completa periódica captura edições e
+    exclusões. As consultas por intervalo usam bisseção, sem acesso ao banco.
+    """
+
+    def __init__(self, client, horizonte_dias=180, intervalo_minimo=60, intervalo_completo=3600):
+        self.client = client
+        self.horizonte_dias = horizonte_dias
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_completo = intervalo_completo
+        self._lock = threading.Lock()
+        self._eventos = []
+        self._indice = _Indice([])
+        self._ultimo_id = None
+        self._ultima_atualizacao = 0.0
+        self._ultima_carga_completa = 0.0
+
+    # --- ATUALIZAÇÃO ---
+    def atualizar(self, forcar=False):
+        """Atualiza o índice se o intervalo mínimo já passou. Retorna True se algo mudou."""
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_atualizacao < self.intervalo_minimo:
+            return False
+        with self._lock:
+            if not forcar and agora - self._ultima_atualizacao < self.intervalo_minimo:
+                return False
+            hoje = date.today()
+            fim = hoje + timedelta(days=self.horizonte_dias)
+            if forcar or self._ultimo_id is None or agora - self._ultima_carga_completa >= self.intervalo_completo:
+                mudou = self._carga_completa(hoje, fim)
+                self._ultima_carga_completa = agora
+            else:
+                mudou = self._carga_incremental(hoje, fim)
+            self._ultima_atualizacao = agora
+            if mudou:
+                self._indice = _Indice(self._eventos)
+            return mudou
+
+    def _buscar(self, inicio, fim, apos_id=0):
+        # Em lotes por id: a janela pode passar do limite de linhas por resposta do PostgREST
+        rows = buscar_em_lotes(
+            lambda: self.client.table('eventos_calendario').select(COLUNAS_EVENTO)
+            .gte('data_evento', inicio.isoformat()).lte('data_evento', fim.isoformat()),
+            apos_id,
+        )
+        return [Evento.from_row(row) for row in rows]
+
+    def _carga_completa(self, inicio, fim):
+        eventos = sorted(self._buscar(inicio, fim))
+        mudou = eventos != self._eventos
+        self._eventos = eventos
+        self._ultimo_id = max((e.id for e in eventos), default=self._ultimo_id or 0)
+        return mudou
+
+    def _carga_incremental(self, inicio, fim):
+        novos = self._buscar(inicio, fim, apos_id=self._ultimo_id)
+        for evento in novos:
+            insort(self._eventos, evento)
+            self._ultimo_id = max(self._ultimo_id, evento.id)
+        # Descarta os eventos que já ficaram para trás
+        passados = 0
+        while passados < len(self._eventos) and self._eventos[passados].data < inicio:
+            passados += 1
+        if passados:
+            del self._eventos[:passados]
+        return bool(novos or passados)
+
+    # --- CONSULTAS ---
+    def consultar(self, inicio=None, fim=None, paises=None, importancias=None):
+        """Retorna os eventos entre `inicio` e `fim` (inclusive), opcionalmente filtrados."""
+        indice = self._indice
+        inicio = _to_date(inicio) if inicio else date.today()
+        fim = _to_date(fim) if fim else inicio + timedelta(days=self.horizonte_dias)
+
+        if paises:
+            fatias = [_Indice.fatia(*indice.por_pais[p], inicio, fim) for p in paises if p in indice.por_pais]
+        elif importancias:
+            fatias = [_Indice.fatia(*indice.por_importancia[i], inicio, fim) for i in importancias if i in indice.por_importancia]
+        else:
+            return list(_Indice.fatia(indice.datas, indice.eventos, inicio, fim))
+
+        eventos = merge(*fatias) if len(fatias) > 1 else (fatias[0] if fatias else ())
+        if paises and importancias:
+            importancias = set(importancias)
+            return [e for e in eventos if e.importancia in importancias]
+        return list(eventos)
+
+    def proximos(self, dias, **filtros):
+        """Atalho para os eventos dos próximos `dias` dias a partir de hoje."""
+        hoje = date.today()
+        return self.consultar(hoje, hoje + timedelta(days=dias), **filtros)
+
+    def paises(self):
+        """Países com eventos no índice, como {pais_id: (nome, emoji)}."""
+        return {e.pais_id: (e.pais_nome, e.pais_emoji) for e in self._indice.eventos}
+
+    def importancias(self):
+        return sorted(self._indice.por_importancia)
@@ -0,0 +1,138 @@
+"""Coalescência de consultas idênticas e simultâneas ao Supabase (single-flight).
+
+Quando várias sessões pedem a mesma consulta ao mesmo tempo, apenas a primeira vai
+ao banco; as restantes esperam e recebem o mesmo resultado. Os resultados são
+partilhados entre sessões e devem ser tratados como somente leitura.
+"""
+import threading
+from dataclasses import dataclass
+
+import streamlit as st
+
+
+def _dividir_colunas(colunas):
+    """Separa a lista de colunas do PostgREST pelas vírgulas de nível superior."""
+    partes, nivel, atual = [], 0, ''
+    for c in colunas.replace(' ', ''):
+        if c == ',' and nivel == 0:
+            partes.append(atual)
+            atual = ''
+            continue
+        nivel += (c == '(') - (c == ')')
+        atual += c
+    return partes + [atual] if atual else partes
+
+
+def _normalizar_valor(valor):
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return tuple(sorted(valor, key=repr))
+    return valor
+
+
+@dataclass(frozen=True)
+class Consulta:
+    """Descrição declarativa de uma consulta: tabela, colunas, filtros, ordem e limite.
+
+    `filtros` é uma sequência de (operador, coluna, valor), com operadores do cliente
+    Supabase (`eq`, `neq`, `in_`, `gte`, ...); `ordem` é uma sequência de (coluna, desc).
+    """
+    tabela: str
+    colunas: str = '*'
+    filtros: tuple = ()
+    ordem: tuple = ()
+    limite: int | None = None
+
+    def chave(self):
+        """Chave canônica: a ordem das colunas e dos filtros não altera o resultado."""
+        return (
+            self.tabela,
+            tuple(sorted(_dividir_colunas(self.colunas))),
+            tuple(sorted(((op, col, _normalizar_valor(v)) for op, col, v in self.filtros), key=repr)),
+            tuple((col, bool(desc)) for col, desc in self.ordem),
+            self.limite,
+        )
+
+    def executar(self, client):
+        query = client.table(self.tabela).select(self.colunas)
+        for op, col, valor in self.filtros:
+            query = getattr(query, op)(col, list(valor) if op == 'in_' else valor)
+        for col, desc in self.ordem:
+            query = query.order(col, desc=desc)
+        if self.limite is not None:
+            query = query.limit(self.limite)
+        return query.execute().data
+
+
+class _EmVoo:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class SingleFlight:
+    """Partilha uma única execução em curso entre todos os chamadores da mesma chave."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo = {}
+        self.chamadas = 0
+        self.execucoes = 0
+        self.deduplicadas = 0
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            self.chamadas += 1
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = _EmVoo()
+                self.execucoes += 1
+            else:
+                self.deduplicadas += 1
+
+        if lider:
+            try:
+                voo.resultado = funcao()
+            except BaseException as e:
+                voo.erro = e
+            finally:
+                with self._lock:
+                    del self._em_voo[chave]
+                voo.pronto.set()
+        else:
+            voo.pronto.wait()
+
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.resultado
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'chamadas': self.chamadas,
+                'execucoes': self.execucoes,
+                'deduplicadas': self.deduplicadas,
+                'em_voo': len(self._em_voo),
+            }
+
+
+class ConsultasCoalescidas:
+    """Executa objetos `Consulta` através de um `SingleFlight` partilhado."""
+
+    def __init__(self, client):
+        self.client = client
+        self.single_flight = SingleFlight()
+
+    def consultar(self, tabela, colunas='*', filtros=(), ordem=(), limite=None):
+        consulta = Consulta(tabela, colunas, tuple(filtros), tuple(ordem), limite)
+        return self.single_flight.executar(consulta.chave(), lambda: consulta.executar(self.client))
+
+    def estatisticas(self):
+        return self.single_flight.estatisticas()
+
+
+@st.cache_resource
+def get_consultas(_client) -> ConsultasCoalescidas:
+    """Instância única por processo, para que sessões diferentes partilhem os voos."""
+    return ConsultasCoalescidas(_client)
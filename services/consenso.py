@@ -0,0 +1,248 @@
+"""Consenso incremental das visões das gestoras por país, classe de ativo e tema."""
+import threading
+import time
+from dataclasses import dataclass
+from math import sqrt
+
+from services.lotes import buscar_em_lotes
+
+VISAO_SCORE = {'Overweight': 1, 'Neutral': 0, 'Underweight': -1}
+# Dimensão -> (coluna da chave, tipo de análise que expressa a visão nessa dimensão)
+DIMENSOES = {'pais': ('pais_id', 'Macro'), 'classe': ('classe_de_ativo_id', 'Asset'), 'tema': ('tema_id', 'Thematic')}
+COLUNAS_CONSENSO = 'id, tipo_analise, gestora_id, pais_id, classe_de_ativo_id, tema_id, visao, data_publicacao'
+
+
+@dataclass(frozen=True)
+class MudancaVisao:
+    chave: tuple
+    gestora_id: int
+    anterior: str
+    nova: str
+    analise_id: int
+    data: str | None
+
+
+@dataclass(frozen=True)
+class Agregado:
+    chave: tuple
+    n_gestoras: int = 0
+    score_liquido: float = 0.0
+    dispersao: float = 0.0
+    ultima_mudanca: MudancaVisao | None = None
+
+
+@dataclass(frozen=True)
+class _Contribuicao:
+    gestora_id: int
+    visao: str
+    data: str
+    chaves: tuple
+
+    @classmethod
+    def from_row(cls, row):
+        if row.get('visao') not in VISAO_SCORE or row.get('gestora_id') is None:
+            return None
+        chaves = tuple(
+            (dim, row[col]) for dim, (col, tipo) in DIMENSOES.items()
+            if row.get('tipo_analise') == tipo and row.get(col) is not None
+        )
+        if not chaves:
+            return None
+        return cls(row['gestora_id'], row['visao'], str(row.get('data_publicacao') or ''), chaves)
+
+
+class _EstadoChave:
+    """Visão vigente de cada gestora numa chave, com somas correntes para as estatísticas."""
+
+    def __init__(self):
+        self.analises = {}  # gestora_id -> {analise_id: (data, analise_id, visao)}
+        self.visoes = {}    # gestora_id -> visão vigente (a da análise mais recente)
+        self.soma = 0
+        self.soma_quadrados = 0
+
+    def recalcular_gestora(self, gestora_id):
+        """Atualiza a visão vigente de uma gestora e devolve (anterior, nova, registro)."""
+        anterior = self.visoes.get(gestora_id)
+        registros = self.analises.get(gestora_id)
+        registro = max(registros.values()) if registros else None
+        nova = registro[2] if registro else None
+        if anterior == nova:
+            return anterior, nova, registro
+        if anterior is not None:
+            self.soma -= VISAO_SCORE[anterior]
+            self.soma_quadrados -= VISAO_SCORE[anterior] ** 2
+            del self.visoes[gestora_id]
+        if nova is not None:
+            self.soma += VISAO_SCORE[nova]
+            self.soma_quadrados += VISAO_SCORE[nova] ** 2
+            self.visoes[gestora_id] = nova
+        if not registros:
+            self.analises.pop(gestora_id, None)
+        return anterior, nova, registro
+
+    def estatisticas(self):
+        n = len(self.visoes)
+        if not n:
+            return 0, 0.0, 0.0
+        media = self.soma / n
+        return n, media, sqrt(max(self.soma_quadrados / n - media ** 2, 0.0))
+
+
+class ConsensoGestoras:
+    """Agregados de consenso mantidos incrementalmente a partir das linhas de `analises`.
+
+    Análises Macro contribuem com a sua visão para a chave ('pais', id), Asset para
+    ('classe', id) e Thematic para ('tema', id); os demais tipos ficam de fora. Para
+    cada chave vale a visão mais recente de cada gestora; o score líquido é a média
+    (-1 a 1) e a dispersão o desvio padrão dessas visões. Inserções e edições só tocam
+    as chaves da própria análise, sem reler a tabela.
+
+    As mudanças de visão detectadas por `aplicar` e pelas sincronizações (exceto a
+    carga inicial, que só reconstrói o histórico) ficam numa fila até serem retiradas
+    com `retirar_mudancas`, para que cada uma gere exatamente um alerta.
+    """
+
+    def __init__(self, client, intervalo_minimo=60, intervalo_completo=3600):
+        self.client = client
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_completo = intervalo_completo
+        self._lock = threading.Lock()
+        self._contribuicoes = {}
+        self._estados = {}
+        self._agregados = {}
+        self._pendentes = []
+        self._ultimo_id = None
+        self._ultima_atualizacao = 0.0
+        self._ultima_carga_completa = 0.0
+
+    # --- ATUALIZAÇÃO INCREMENTAL ---
+    def aplicar(self, row):
+        """Aplica uma análise inserida ou editada. Devolve as mudanças de visão detectadas."""
+        with self._lock:
+            if self._ultimo_id is not None:
+                self._ultimo_id = max(self._ultimo_id, row['id'])
+            mudancas = self._aplicar(row['id'], _Contribuicao.from_row(row))
+            self._pendentes += mudancas
+            return mudancas
+
+    def remover(self, analise_id):
+        """Retira a contribuição de uma análise apagada."""
+        with self._lock:
+            return self._aplicar(analise_id, None)
+
+    def _aplicar(self, analise_id, nova):
+        antiga = self._contribuicoes.get(analise_id)
+        if antiga == nova:
+            return []
+        afetadas = set()
+        if antiga:
+            for chave in antiga.chaves:
+                self._estados[chave].analises.get(antiga.gestora_id, {}).pop(analise_id, None)
+                afetadas.add((chave, antiga.gestora_id))
+            del self._contribuicoes[analise_id]
+        if nova:
+            for chave in nova.chaves:
+                estado = self._estados.setdefault(chave, _EstadoChave())
+                estado.analises.setdefault(nova.gestora_id, {})[analise_id] = (nova.data, analise_id, nova.visao)
+                afetadas.add((chave, nova.gestora_id))
+            self._contribuicoes[analise_id] = nova
+
+        # Primeiro recalcula todas as gestoras afetadas; só depois descarta as chaves vazias,
+        # porque a mesma chave pode aparecer com a gestora antiga e com a nova
+        mudancas = []
+        ultimas = {}
+        for chave, gestora_id in afetadas:
+            anterior, atual, registro = self._estados[chave].recalcular_gestora(gestora_id)
+            ultimas.setdefault(chave, None)
+            if anterior and atual and anterior != atual:
+                ultimas[chave] = MudancaVisao(chave, gestora_id, anterior, atual, registro[1], registro[0] or None)
+                mudancas.append(ultimas[chave])
+        for chave, ultima in ultimas.items():
+            n, score, dispersao = self._estados[chave].estatisticas()
+            if n:
+                ultima = ultima or self._agregados.get(chave, Agregado(chave)).ultima_mudanca
+                self._agregados[chave] = Agregado(chave, n, score, dispersao, ultima)
+            else:
+                self._agregados.pop(chave, None)
+                self._estados.pop(chave, None)
+        return mudancas
+
+    # --- SINCRONIZAÇÃO COM O BANCO ---
+    def atualizar(self, forcar=False):
+        """Traz do banco as análises novas; periodicamente, confere a tabela inteira."""
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_atualizacao < self.intervalo_minimo:
+            return []
+        completa = forcar or self._ultimo_id is None or agora - self._ultima_carga_completa >= self.intervalo_completo
+        rows = buscar_em_lotes(
+            lambda: self.client.table('analises').select(COLUNAS_CONSENSO),
+            apos_id=0 if completa else self._ultimo_id,
+        )
+
+        with self._lock:
+            mudancas = []
+            for row in rows:
+                mudancas += self._aplicar(row['id'], _Contribuicao.from_row(row))
+            if self._ultimo_id is not None:
+                self._pendentes += mudancas
+            if completa:
+                vistos = {row['id'] for row in rows}
+                for analise_id in [a for a in self._contribuicoes if a not in vistos]:
+                    mudancas += self._aplicar(analise_id, None)
+                self._ultima_carga_completa = agora
+            self._ultimo_id = max([row['id'] for row in rows] + [self._ultimo_id or 0])
+            self._ultima_atualizacao = agora
+            return mudancas
+
+    # --- FILA DE ALERTAS ---
+    def retirar_mudancas(self):
+        """Esvazia a fila de mudanças de visão ainda sem alerta e devolve o seu conteúdo."""
+        with self._lock:
+            mudancas, self._pendentes = self._pendentes, []
+            return mudancas
+
+    def devolver_mudancas(self, mudancas):
+        """Recoloca à frente da fila mudanças cujo alerta não chegou a ser gravado."""
+        with self._lock:
+            self._pendentes = list(mudancas) + self._pendentes
+
+    # --- CONSULTAS ---
+    def agregado(self, dimensao, valor_id):
+        return self._agregados.get((dimensao, valor_id))
+
+    def agregados(self, dimensao):
+        return {chave[1]: ag for chave, ag in list(self._agregados.items()) if chave[0] == dimensao}
+
+    def visoes(self, dimensao, valor_id):
+        """Visão vigente de cada gestora para a chave, como {gestora_id: visão}."""
+        estado = self._estados.get((dimensao, valor_id))
+        return dict(estado.visoes) if estado else {}
+
+
+# --- ALERTAS AUTOMÁTICOS ---
+ROTULOS_DIMENSAO = {'pais': 'País', 'classe': 'Classe de Ativo', 'tema': 'Tema'}
+
+
+def alerta_mudanca_visao(mudanca, nomes):
+    """Monta a linha de `alertas` para uma mudança de visão.
+
+    `nomes` mapeia (dimensao, id) e ('gestora', id) para os nomes de exibição.
+    """
+    dimensao, valor_id = mudanca.chave
+    gestora = nomes.get(('gestora', mudanca.gestora_id), 'Gestora')
+    alvo = nomes.get(mudanca.chave, f"{ROTULOS_DIMENSAO[dimensao]} {valor_id}")
+    salto = abs(VISAO_SCORE[mudanca.nova] - VISAO_SCORE[mudanca.anterior])
+    return {
+        'titulo': f"{gestora} muda visão em {alvo}: {mudanca.anterior} → {mudanca.nova}",
+        'tipo_alerta': 'Mudança de Visão',
+        'importancia': 'Alta' if salto == 2 else 'Média',
+        'descricao': f"{ROTULOS_DIMENSAO[dimensao]}: {alvo}. Visão anterior: {mudanca.anterior}; nova visão: {mudanca.nova}.",
+    }
+
+
+def publicar_alertas(client, mudancas, nomes):
+    """Insere em `alertas` uma linha 'Mudança de Visão' para cada mudança detectada."""
+    if not mudancas:
+        return []
+    linhas = [alerta_mudanca_visao(m, nomes) for m in mudancas]
+    return client.table('alertas').insert(linhas).execute().data
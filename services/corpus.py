@@ -0,0 +1,238 @@
+"""Corpus de análises em colunas compactas, partilhado e somente leitura.
+
+`st.cache_data` devolve uma cópia desserializada a cada acerto; para listas grandes de
+análises isso custa CPU e memória a cada rerun. O `CorpusAnalises` guarda o corpus uma
+única vez por processo, em arrays NumPy (códigos categóricos e chaves inteiras) e tuplas
+de textos, e as páginas recebem índices e vistas leves das linhas, sem cópias.
+"""
+import sys
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from operator import itemgetter
+from types import MappingProxyType
+
+import numpy as np
+
+from services.lotes import buscar_em_lotes
+
+TIPOS_ANALISE = ("Macro", "Visão BC", "Tese", "Asset", "MicroAsset", "Thematic", "Driver")
+VISOES = ("Overweight", "Neutral", "Underweight", "N/A")
+CHAVES = ('pais_id', 'gestora_id', 'classe_de_ativo_id', 'subclasse_de_ativo_id', 'tema_id')
+TEXTOS = ('titulo', 'resumo', 'texto_completo')
+COLUNAS_CORPUS = 'id, tipo_analise, visao, data_publicacao, ' + ', '.join(CHAVES + TEXTOS) + ', gestoras(nome)'
+SEM_VALOR = -1
+
+
+def _codigo(categorias, valor):
+    try:
+        return categorias.index(valor)
+    except ValueError:
+        return SEM_VALOR
+
+
+def _filtro(coluna, valores):
+    """Máscara para um id ou uma coleção de ids."""
+    if isinstance(valores, (list, tuple, set, frozenset, np.ndarray)):
+        return np.isin(coluna, np.fromiter(valores, dtype=np.int64, count=len(valores)))
+    return coluna == valores
+
+
+class CorpusAnalises:
+    """Fotografia imutável do corpus; as colunas são partilhadas entre todas as sessões.
+
+    `linhagem` é um marcador partilhado só pelos corpus obtidos uns dos outros com
+    `concatenar`: dois corpus da mesma linhagem diferem apenas por linhas acrescentadas
+    no fim. Cargas completas, `take` e recargas de ids começam uma linhagem nova.
+    """
+
+    def __init__(self, colunas, textos, gestoras, linhagem=None):
+        self.colunas = colunas
+        self.textos = textos
+        self.gestoras = gestoras
+        self.linhagem = linhagem if linhagem is not None else object()
+        self.ids = colunas['id']
+        self.posicoes = {int(analise_id): i for i, analise_id in enumerate(self.ids)}
+        for array in colunas.values():
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows, gestoras=None):
+        gestoras = dict(gestoras or {})
+        for row in rows:
+            if row.get('gestoras') and row.get('gestora_id') is not None:
+                gestoras.setdefault(row['gestora_id'], sys.intern(row['gestoras']['nome']))
+
+        def inteiros(nome):
+            return np.fromiter((SEM_VALOR if r.get(nome) is None else r[nome] for r in rows), dtype=np.int64, count=len(rows))
+
+        colunas = {
+            'id': inteiros('id'),
+            'tipo_analise': np.fromiter((_codigo(TIPOS_ANALISE, r.get('tipo_analise')) for r in rows), dtype=np.int8, count=len(rows)),
+            'visao': np.fromiter((_codigo(VISOES, r.get('visao')) for r in rows), dtype=np.int8, count=len(rows)),
+            'data_publicacao': np.array([str(r.get('data_publicacao') or '')[:10] or 'NaT' for r in rows], dtype='datetime64[D]'),
+            **{nome: inteiros(nome) for nome in CHAVES},
+        }
+        textos = {nome: tuple(r.get(nome) or '' for r in rows) for nome in TEXTOS}
+        return cls(colunas, textos, MappingProxyType(gestoras))
+
+    # --- COMPOSIÇÃO (usada nas atualizações incrementais) ---
+    def take(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        colunas = {nome: array[indices] for nome, array in self.colunas.items()}
+        pegar = itemgetter(*indices) if len(indices) > 1 else (lambda t: tuple(t[i] for i in indices))
+        textos = {nome: tuple(pegar(valores)) for nome, valores in self.textos.items()}
+        return CorpusAnalises(colunas, textos, self.gestoras)
+
+    def concatenar(self, outro):
+        colunas = {nome: np.concatenate([array, outro.colunas[nome]]) for nome, array in self.colunas.items()}
+        textos = {nome: valores + outro.textos[nome] for nome, valores in self.textos.items()}
+        return CorpusAnalises(colunas, textos, MappingProxyType({**self.gestoras, **outro.gestoras}), self.linhagem)
+
+    # --- CONSULTAS ---
+    def filtrar(self, tipos=None, visao_excluida=None, **chaves):
+        """Índices das linhas que atendem aos filtros.
+
+        `tipos` é um tipo ou uma coleção de tipos de análise; `chaves` aceita as colunas
+        de CHAVES com um id ou uma coleção de ids (ex.: pais_id=3, tema_id=[1, 2]).
+        `visao_excluida` descarta essa visão e também as linhas sem visão.
+        """
+        mascara = np.ones(len(self), dtype=bool)
+        if tipos is not None:
+            tipos = [tipos] if isinstance(tipos, str) else tipos
+            mascara &= np.isin(self.colunas['tipo_analise'], [_codigo(TIPOS_ANALISE, t) for t in tipos])
+        if visao_excluida is not None:
+            visao = self.colunas['visao']
+            mascara &= (visao != _codigo(VISOES, visao_excluida)) & (visao != SEM_VALOR)
+        for nome, valores in chaves.items():
+            if valores is not None:
+                mascara &= _filtro(self.colunas[nome], valores)
+        return np.flatnonzero(mascara)
+
+    def ordenar_por_data(self, indices, desc=True, limite=None):
+        # Como int64, NaT vira o menor valor e as análises sem data ficam por último em `desc`
+        ordem = np.argsort(self.colunas['data_publicacao'][indices].astype(np.int64), kind='stable')
+        if desc:
+            ordem = ordem[::-1]
+        return indices[ordem[:limite]] if limite is not None else indices[ordem]
+
+    def linhas(self, indices):
+        return FatiaAnalises(self, indices)
+
+    def linha(self, analise_id):
+        posicao = self.posicoes.get(analise_id)
+        return AnaliseView(self, posicao) if posicao is not None else None
+
+
+class AnaliseView(Mapping):
+    """Vista de uma linha do corpus com a mesma interface dos dicts do Supabase."""
+    __slots__ = ('_corpus', '_i')
+    _CAMPOS = ('id', 'tipo_analise', 'visao', 'data_publicacao') + CHAVES + TEXTOS + ('gestoras',)
+
+    def __init__(self, corpus, i):
+        self._corpus = corpus
+        self._i = i
+
+    def __getitem__(self, campo):
+        corpus, i = self._corpus, self._i
+        if campo in corpus.textos:
+            return corpus.textos[campo][i]
+        if campo == 'gestoras':
+            nome = corpus.gestoras.get(int(corpus.colunas['gestora_id'][i]))
+            return {'nome': nome} if nome is not None else None
+        if campo == 'tipo_analise':
+            codigo = corpus.colunas['tipo_analise'][i]
+            return TIPOS_ANALISE[codigo] if codigo != SEM_VALOR else None
+        if campo == 'visao':
+            codigo = corpus.colunas['visao'][i]
+            return VISOES[codigo] if codigo != SEM_VALOR else 'N/A'
+        if campo == 'data_publicacao':
+            data = corpus.colunas['data_publicacao'][i]
+            return None if np.isnat(data) else str(data)
+        if campo in corpus.colunas:
+            valor = int(corpus.colunas[campo][i])
+            return None if valor == SEM_VALOR and campo != 'id' else valor
+        raise KeyError(campo)
+
+    def __iter__(self):
+        return iter(self._CAMPOS)
+
+    def __len__(self):
+        return len(self._CAMPOS)
+
+
+class FatiaAnalises(Sequence):
+    """Sequência de `AnaliseView` sobre um array de índices, sem materializar dicts."""
+    __slots__ = ('_corpus', '_indices')
+
+    def __init__(self, corpus, indices):
+        self._corpus = corpus
+        self._indices = indices
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return FatiaAnalises(self._corpus, self._indices[i])
+        return AnaliseView(self._corpus, int(self._indices[i]))
+
+    def __len__(self):
+        return len(self._indices)
+
+
+class CorpusStore:
+    """Mantém o `CorpusAnalises` corrente, trazendo do banco apenas as linhas novas.
+
+    Edições e exclusões feitas neste processo entram por `recarregar_ids`; as de outros
+    processos são apanhadas pela recarga completa periódica.
+    """
+
+    def __init__(self, client, intervalo_minimo=60, intervalo_completo=3600):
+        self.client = client
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_completo = intervalo_completo
+        self._lock = threading.Lock()
+        self._corpus = CorpusAnalises.from_rows([])
+        self._ultimo_id = None
+        self._ultima_atualizacao = 0.0
+        self._ultima_carga_completa = 0.0
+
+    @property
+    def corpus(self) -> CorpusAnalises:
+        return self._corpus
+
+    def _buscar(self, apos_id=0, ids=None):
+        def montar_query():
+            query = self.client.table('analises').select(COLUNAS_CORPUS)
+            return query.in_('id', list(ids)) if ids is not None else query
+        return buscar_em_lotes(montar_query, apos_id)
+
+    def atualizar(self, forcar=False):
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_atualizacao < self.intervalo_minimo:
+            return False
+        with self._lock:
+            if forcar or self._ultimo_id is None or agora - self._ultima_carga_completa >= self.intervalo_completo:
+                rows = self._buscar()
+                self._corpus = CorpusAnalises.from_rows(rows)
+                self._ultima_carga_completa = agora
+                mudou = True
+            else:
+                rows = self._buscar(apos_id=self._ultimo_id)
+                if rows:
+                    self._corpus = self._corpus.concatenar(CorpusAnalises.from_rows(rows, self._corpus.gestoras))
+                mudou = bool(rows)
+            self._ultimo_id = max([r['id'] for r in rows] + [self._ultimo_id or 0])
+            self._ultima_atualizacao = agora
+            return mudou
+
+    def recarregar_ids(self, ids):
+        """Substitui (ou remove, se já não existirem) as linhas com os ids dados."""
+        ids = set(ids)
+        with self._lock:
+            rows = self._buscar(ids=ids)
+            corpus = self._corpus
+            manter = np.flatnonzero(~np.isin(corpus.ids, list(ids)))
+            self._corpus = corpus.take(manter).concatenar(CorpusAnalises.from_rows(rows, corpus.gestoras))
+            self._ultimo_id = max([r['id'] for r in rows] + [self._ultimo_id or 0])
@@ -0,0 +1,124 @@
+"""Matrizes de visões cruzadas (tema × gestora, classe de ativo × país) a partir do corpus."""
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from services.corpus import SEM_VALOR, VISOES
+
+# Score numérico de cada código de visão do corpus; N/A fica fora das matrizes
+SCORE_POR_CODIGO = np.array([1.0, 0.0, -1.0, np.nan])
+CODIGO_NA = VISOES.index('N/A')
+
+
+class MatrizVisoes:
+    """Pivot de um tipo de análise em duas dimensões do corpus.
+
+    Cada célula guarda o número de análises, a visão mais recente (como score -1/0/1) e
+    a data dessa visão. Quando o corpus é da mesma linhagem do anterior (só ganhou linhas
+    no fim), apenas as novas linhas são agregadas e fundidas à matriz existente; cargas
+    completas e recargas de ids, que podem ter editado linhas antigas, reconstroem tudo.
+    """
+
+    def __init__(self, tipo_analise, coluna_linha, coluna_coluna):
+        self.tipo_analise = tipo_analise
+        self.coluna_linha = coluna_linha
+        self.coluna_coluna = coluna_coluna
+        self.linhas = np.array([], dtype=np.int64)
+        self.colunas = np.array([], dtype=np.int64)
+        self.contagem = np.zeros((0, 0), dtype=np.int64)
+        self.score = np.zeros((0, 0))
+        self.data = np.zeros((0, 0), dtype='datetime64[D]')
+        self._corpus = None
+        self._eixos = None
+        self._lock = threading.Lock()
+
+    def atualizar(self, corpus, ids_linhas, ids_colunas):
+        """Sincroniza a matriz com o corpus e os eixos (ids das tabelas de referência)."""
+        eixos = (tuple(ids_linhas), tuple(ids_colunas))
+        with self._lock:
+            if corpus is self._corpus and eixos == self._eixos:
+                return False
+            anterior = self._corpus
+            anexado = (
+                anterior is not None and eixos == self._eixos
+                and corpus.linhagem is anterior.linhagem and len(corpus) >= len(anterior)
+            )
+            if anexado:
+                self._fundir(*self._agregar(corpus, np.arange(len(anterior), len(corpus))))
+            else:
+                self.linhas = np.array(sorted(eixos[0]), dtype=np.int64)
+                self.colunas = np.array(sorted(eixos[1]), dtype=np.int64)
+                self.contagem, self.score, self.data = self._agregar(corpus, np.arange(len(corpus)))
+            self._corpus, self._eixos = corpus, eixos
+            return True
+
+    def _posicoes(self, eixo, valores):
+        posicoes = np.searchsorted(eixo, valores)
+        validas = (valores != SEM_VALOR) & (posicoes < len(eixo))
+        validas[validas] &= eixo[posicoes[validas]] == valores[validas]
+        return posicoes, validas
+
+    def _agregar(self, corpus, indices):
+        forma = (len(self.linhas), len(self.colunas))
+        contagem = np.zeros(forma, dtype=np.int64)
+        score = np.full(forma, np.nan)
+        data = np.full(forma, np.datetime64('NaT'), dtype='datetime64[D]')
+
+        indices = np.intersect1d(indices, corpus.filtrar(self.tipo_analise), assume_unique=True)
+        r, ok_r = self._posicoes(self.linhas, corpus.colunas[self.coluna_linha][indices])
+        c, ok_c = self._posicoes(self.colunas, corpus.colunas[self.coluna_coluna][indices])
+        ok = ok_r & ok_c
+        indices, r, c = indices[ok], r[ok], c[ok]
+        np.add.at(contagem, (r, c), 1)
+
+        # Visão mais recente por célula: ordena por (data, id) e fica com a última de cada célula
+        com_visao = corpus.colunas['visao'][indices] != CODIGO_NA
+        indices, r, c = indices[com_visao], r[com_visao], c[com_visao]
+        datas = corpus.colunas['data_publicacao'][indices]
+        ordem = np.lexsort((corpus.ids[indices], datas.astype(np.int64)))[::-1]
+        celulas = (r * forma[1] + c)[ordem]
+        _, primeiras = np.unique(celulas, return_index=True)
+        escolhidos = ordem[primeiras]
+        score[r[escolhidos], c[escolhidos]] = SCORE_POR_CODIGO[corpus.colunas['visao'][indices[escolhidos]]]
+        data[r[escolhidos], c[escolhidos]] = datas[escolhidos]
+        return contagem, score, data
+
+    def _fundir(self, contagem, score, data):
+        mais_recente = ~np.isnat(data) & (np.isnat(self.data) | (data >= self.data))
+        self.contagem = self.contagem + contagem
+        self.score = np.where(mais_recente, score, self.score)
+        self.data = np.where(mais_recente, data, self.data)
+
+    def para_dataframe(self, nomes_linhas, nomes_colunas):
+        """Células não vazias em formato longo, prontas para o gráfico."""
+        with self._lock:
+            r, c = np.nonzero(self.contagem)
+            scores = self.score[r, c]
+            return pd.DataFrame({
+                'linha': [nomes_linhas.get(int(i), 'N/A') for i in self.linhas[r]],
+                'coluna': [nomes_colunas.get(int(i), 'N/A') for i in self.colunas[c]],
+                'score': scores,
+                'visao': [VISOES[int(1 - s)] if not np.isnan(s) else 'N/A' for s in scores],
+                'n_analises': self.contagem[r, c],
+                'data': pd.to_datetime(self.data[r, c]),
+            })
+
+
+class PainelHeatmaps:
+    """As duas matrizes da visão geral, partilhadas por todas as sessões."""
+
+    def __init__(self):
+        self.tema_gestora = MatrizVisoes('Thematic', 'tema_id', 'gestora_id')
+        self.classe_pais = MatrizVisoes('Asset', 'classe_de_ativo_id', 'pais_id')
+
+    def atualizar(self, corpus, snapshot):
+        ids = lambda itens: [item['id'] for item in itens]
+        self.tema_gestora.atualizar(corpus, ids(snapshot.temas), ids(snapshot.gestoras))
+        self.classe_pais.atualizar(corpus, ids(snapshot.classes_de_ativos), ids(snapshot.paises))
+
+
+@st.cache_resource
+def get_painel_heatmaps() -> PainelHeatmaps:
+    return PainelHeatmaps()
@@ -0,0 +1,21 @@
+"""Leitura paginada por id, para contornar o limite de linhas por resposta do PostgREST."""
+
+# Linhas pedidas por lote; o servidor pode devolver menos se o seu `db-max-rows` for menor
+TAMANHO_LOTE = 1000
+
+
+def buscar_em_lotes(montar_query, apos_id=0, tamanho=TAMANHO_LOTE):
+    """Busca todas as linhas de uma consulta em lotes ordenados por id.
+
+    `montar_query` devolve uma consulta nova (tabela, colunas e filtros) a cada lote;
+    cada lote pede as linhas com id maior que o último id do lote anterior. Um lote
+    menor que `tamanho` não prova que acabou (o servidor pode cortar antes), por isso
+    só um lote vazio encerra a leitura.
+    """
+    rows = []
+    while True:
+        lote = montar_query().gt('id', apos_id).order('id').limit(tamanho).execute().data
+        if not lote:
+            return rows
+        rows += lote
+        apos_id = lote[-1]['id']
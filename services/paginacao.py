@@ -0,0 +1,75 @@
+"""Paginação por chave (keyset) das análises e índices de referência para os seletores do Admin."""
+from dataclasses import dataclass, field
+
+COLUNAS_PICKER = 'id, titulo, tipo_analise, data_publicacao, gestoras(nome), paises(nome)'
+
+
+@dataclass(frozen=True)
+class FiltrosAnalise:
+    tipo_analise: str | None = None
+    pais_id: int | None = None
+    gestora_id: int | None = None
+    data_inicio: str | None = None
+    data_fim: str | None = None
+    titulo: str = ''
+
+
+def buscar_pagina_analises(client, filtros, cursor=None, limite=25):
+    """Busca uma página de análises ordenada por `data_publicacao` desc, `id` desc.
+
+    `cursor` é o par (data_publicacao, id) da última linha da página anterior; o
+    filtro por chave evita o custo crescente de `offset`. Análises sem data vêm
+    primeiro (NULLS FIRST, o padrão do Postgres em ordem desc), pedido explicitamente
+    para que o cursor não dependa do padrão. Devolve (linhas, próximo cursor), com o
+    cursor None na última página.
+    """
+    query = client.table('analises').select(COLUNAS_PICKER)
+    if filtros.tipo_analise:
+        query = query.eq('tipo_analise', filtros.tipo_analise)
+    if filtros.pais_id is not None:
+        query = query.eq('pais_id', filtros.pais_id)
+    if filtros.gestora_id is not None:
+        query = query.eq('gestora_id', filtros.gestora_id)
+    if filtros.data_inicio:
+        query = query.gte('data_publicacao', filtros.data_inicio)
+    if filtros.data_fim:
+        query = query.lte('data_publicacao', filtros.data_fim)
+    if filtros.titulo:
+        query = query.ilike('titulo', f"%{filtros.titulo}%")
+    if cursor:
+        data, analise_id = cursor
+        if data is None:
+            # Ainda no bloco sem data: resto desse bloco e, depois, todas as análises datadas
+            query = query.or_(f'and(data_publicacao.is.null,id.lt.{analise_id}),data_publicacao.not.is.null')
+        else:
+            # Aspas porque datas com hora contêm caracteres reservados do PostgREST (: e .)
+            query = query.or_(f'data_publicacao.lt."{data}",and(data_publicacao.eq."{data}",id.lt.{analise_id})')
+
+    # Pede uma linha a mais para saber se existe a página seguinte
+    linhas = query.order('data_publicacao', desc=True, nullsfirst=True).order('id', desc=True) \
+        .limit(limite + 1).execute().data
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        return linhas, (linhas[-1]['data_publicacao'], linhas[-1]['id'])
+    return linhas, None
+
+
+@dataclass(frozen=True)
+class IndiceReferencia:
+    """Opções de um seletor chaveadas por id, com a posição de cada id pré-calculada."""
+    ids: tuple
+    nomes: dict = field(repr=False)
+    posicoes: dict = field(repr=False)
+
+    @classmethod
+    def from_rows(cls, rows):
+        ids = tuple(item['id'] for item in rows)
+        nomes = {item['id']: item['nome'] for item in rows}
+        return cls(ids, nomes, {valor_id: i for i, valor_id in enumerate(ids)})
+
+    def indice(self, valor_id):
+        """Posição do id nas opções, ou 0 (primeira opção) se não existir."""
+        return self.posicoes.get(valor_id, 0)
+
+    def nome(self, valor_id):
+        return self.nomes.get(valor_id, 'N/A')
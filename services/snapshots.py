@@ -0,0 +1,153 @@
+"""Atualizador em segundo plano que publica fotografias imutáveis dos dados do Hub.
+
+Um único thread por processo consulta o Supabase em intervalos fixos e publica um
+`HubSnapshot`. Todas as sessões do Streamlit leem a fotografia corrente sem I/O,
+de modo que a carga no banco não cresce com o número de utilizadores.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+
+import streamlit as st
+
+from services.calendario import CalendarioEventos
+from services.consenso import ConsensoGestoras, publicar_alertas
+from services.corpus import CorpusStore
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_PADRAO = 30  # segundos
+
+
+def _congelar(obj):
+    """Converte recursivamente dicts e listas em estruturas somente leitura."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _congelar(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(_congelar(v) for v in obj)
+    return obj
+
+
+@dataclass(frozen=True)
+class HubSnapshot:
+    versao: int = 0
+    atualizado_em: datetime | None = None
+    novas_analises: tuple = ()
+    alertas: tuple = ()
+    paises: tuple = ()
+    classes_de_ativos: tuple = ()
+    temas: tuple = ()
+    gestoras: tuple = ()
+    # Conteúdo das tabelas de referência (países, classes, temas, gestoras) e a sua impressão digital
+    referencias: tuple = field(default=(), repr=False)
+    versao_referencias: int = 0
+
+    def nomes(self):
+        """Nomes de exibição indexados por (dimensão, id), no formato usado pelo consenso."""
+        grupos = {'pais': self.paises, 'classe': self.classes_de_ativos, 'tema': self.temas, 'gestora': self.gestoras}
+        return {(dimensao, item['id']): item['nome'] for dimensao, itens in grupos.items() for item in itens}
+
+
+class HubRefresher:
+    """Mantém o `HubSnapshot` corrente, o calendário, o consenso e o corpus atualizados num thread próprio."""
+
+    def __init__(self, client, intervalo=INTERVALO_PADRAO, iniciar=True):
+        self.client = client
+        self.intervalo = intervalo
+        self.calendario = CalendarioEventos(client, intervalo_minimo=0)
+        self.consenso = ConsensoGestoras(client, intervalo_minimo=0)
+        self.corpus = CorpusStore(client, intervalo_minimo=0)
+        self.ultimo_erro = None
+        self._snapshot = HubSnapshot()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self.atualizar()
+        if iniciar:
+            self.iniciar()
+
+    @property
+    def snapshot(self) -> HubSnapshot:
+        return self._snapshot
+
+    # --- CICLO DE VIDA ---
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="hub-refresher", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=self.intervalo)
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.atualizar()
+
+    # --- ATUALIZAÇÃO ---
+    def _buscar(self):
+        analises = self.client.table('analises').select(
+            'id, titulo, resumo, tipo_analise, data_publicacao, gestoras(nome)'
+        ).order('data_publicacao', desc=True).limit(5).execute().data
+        alertas = self.client.table('alertas').select('*').order('created_at', desc=True).limit(5).execute().data
+        paises = self.client.table('paises').select('id, nome, emoji_bandeira').order('nome').execute().data
+        classes = self.client.table('classes_de_ativos').select('id, nome').order('nome').execute().data
+        temas = self.client.table('temas').select('id, nome').order('nome').execute().data
+        gestoras = self.client.table('gestoras').select('id, nome').order('nome').execute().data
+        return analises, alertas, paises, classes, temas, gestoras
+
+    def _publicar_alertas(self):
+        mudancas = self.consenso.retirar_mudancas()
+        try:
+            publicar_alertas(self.client, mudancas, self._snapshot.nomes())
+        except Exception:
+            self.consenso.devolver_mudancas(mudancas)
+            raise
+
+    def atualizar(self):
+        """Consulta o banco e publica uma nova fotografia se algo mudou."""
+        with self._lock:
+            try:
+                self.calendario.atualizar(forcar=False)
+                self.consenso.atualizar(forcar=False)
+                # Único ponto de publicação dos alertas de 'Mudança de Visão', antes da leitura
+                # de `alertas` para que já entrem nesta fotografia
+                self._publicar_alertas()
+                self.corpus.atualizar(forcar=False)
+                analises, alertas, paises, classes, temas, gestoras = map(_congelar, self._buscar())
+            except Exception as e:
+                # Mantém a última fotografia válida; a próxima iteração tenta de novo
+                self.ultimo_erro = e
+                logger.exception("Falha ao atualizar o snapshot do Hub")
+                return False
+
+            self.ultimo_erro = None
+            atual = self._snapshot
+            referencias = tuple(tuple(sorted(r.items())) for r in paises + classes + temas + gestoras)
+            if (analises, alertas, referencias) == (atual.novas_analises, atual.alertas, atual.referencias):
+                return False
+
+            self._snapshot = HubSnapshot(
+                versao=atual.versao + 1,
+                atualizado_em=datetime.now(),
+                novas_analises=analises,
+                alertas=alertas,
+                paises=paises,
+                classes_de_ativos=classes,
+                temas=temas,
+                gestoras=gestoras,
+                referencias=referencias,
+                versao_referencias=atual.versao_referencias + (referencias != atual.referencias),
+            )
+            return True
+
+
+@st.cache_resource
+def get_refresher(_client, intervalo=INTERVALO_PADRAO) -> HubRefresher:
+    """Instância única por processo, partilhada por todas as sessões e páginas."""
+    return HubRefresher(_client, intervalo=intervalo)
@@ -0,0 +1,58 @@
+-- Grava a alocação modelo de um perfil e as diferenças dos seus componentes numa única transação.
+-- Chamada pelo Admin via supabase.rpc('salvar_componentes_alocacao', ...); ver services/alocacoes.py.
+create or replace function salvar_componentes_alocacao(
+    p_perfil_id bigint,
+    p_nome_estrategia text,
+    p_inserir jsonb default '[]',
+    p_atualizar jsonb default '[]',
+    p_apagar bigint[] default '{}'
+) returns bigint
+language plpgsql
+as $$
+declare
+    v_alocacao_id bigint;
+    v_total numeric;
+begin
+    select id into v_alocacao_id
+    from alocacoes_modelo
+    where perfil_de_risco_id = p_perfil_id
+    limit 1
+    for update;
+
+    if v_alocacao_id is null then
+        insert into alocacoes_modelo (perfil_de_risco_id, nome_estrategia)
+        values (p_perfil_id, p_nome_estrategia)
+        returning id into v_alocacao_id;
+    else
+        update alocacoes_modelo
+        set nome_estrategia = p_nome_estrategia
+        where id = v_alocacao_id and nome_estrategia is distinct from p_nome_estrategia;
+    end if;
+
+    delete from componentes_alocacao
+    where alocacao_modelo_id = v_alocacao_id and id = any(p_apagar);
+
+    -- Só as colunas presentes no objeto são alteradas
+    update componentes_alocacao c
+    set nome_ativo     = case when u ? 'nome_ativo'     then u->>'nome_ativo'               else c.nome_ativo end,
+        ticker_exemplo = case when u ? 'ticker_exemplo' then u->>'ticker_exemplo'           else c.ticker_exemplo end,
+        percentual     = case when u ? 'percentual'     then (u->>'percentual')::numeric    else c.percentual end,
+        justificativa  = case when u ? 'justificativa'  then u->>'justificativa'            else c.justificativa end
+    from jsonb_array_elements(p_atualizar) u
+    where c.id = (u->>'id')::bigint and c.alocacao_modelo_id = v_alocacao_id;
+
+    insert into componentes_alocacao (alocacao_modelo_id, nome_ativo, ticker_exemplo, percentual, justificativa)
+    select v_alocacao_id, i->>'nome_ativo', i->>'ticker_exemplo', (i->>'percentual')::numeric, i->>'justificativa'
+    from jsonb_array_elements(p_inserir) i;
+
+    select coalesce(sum(percentual), 0) into v_total
+    from componentes_alocacao
+    where alocacao_modelo_id = v_alocacao_id;
+
+    if v_total not between 99.9 and 100.1 then
+        raise exception 'A soma dos percentuais deve ser 100%%. Soma atual: %', v_total;
+    end if;
+
+    return v_alocacao_id;
+end;
+$$;
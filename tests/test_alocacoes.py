@@ -0,0 +1,102 @@
+"""Diferenças dos componentes editados e gravação transacional das alocações modelo."""
+import math
+
+import pandas as pd
+import pytest
+
+from services.alocacoes import DiffAlocacao, diff_componentes, salvar_alocacao
+from tools.sqlite_rpc import AlocacoesSQLite
+
+ORIGINAIS = [
+    {'id': 1, 'nome_ativo': 'Ações', 'ticker_exemplo': 'BOVA11', 'percentual': 40.0, 'justificativa': 'Crescimento.'},
+    {'id': 2, 'nome_ativo': 'Renda Fixa', 'ticker_exemplo': 'IMAB11', 'percentual': 60.0, 'justificativa': 'Proteção.'},
+]
+
+
+def editar(linhas):
+    """Reproduz a saída do `st.data_editor`: ids como float, com NaN nas linhas novas."""
+    return pd.DataFrame(linhas, columns=['id', 'nome_ativo', 'ticker_exemplo', 'percentual', 'justificativa']).to_dict('records')
+
+
+# --- DIFERENÇAS ---
+def test_sem_alteracoes_gera_diff_vazio():
+    diff = diff_componentes(ORIGINAIS, editar(ORIGINAIS))
+    assert not diff
+    assert diff == DiffAlocacao()
+
+
+def test_linha_com_id_nan_e_insercao():
+    nova = {'id': math.nan, 'nome_ativo': 'Ouro', 'ticker_exemplo': 'GOLD11', 'percentual': 10, 'justificativa': 'Reserva.'}
+    diff = diff_componentes(ORIGINAIS, editar(ORIGINAIS + [nova]))
+    assert diff.inserir == [{'nome_ativo': 'Ouro', 'ticker_exemplo': 'GOLD11', 'percentual': 10.0, 'justificativa': 'Reserva.'}]
+    assert diff.atualizar == [] and diff.apagar == []
+
+
+def test_atualizacao_leva_so_as_colunas_alteradas():
+    editados = [dict(ORIGINAIS[0], percentual=45, justificativa='Crescimento e dividendos.'), ORIGINAIS[1]]
+    diff = diff_componentes(ORIGINAIS, editar(editados))
+    assert diff.atualizar == [{'id': 1, 'percentual': 45.0, 'justificativa': 'Crescimento e dividendos.'}]
+    assert diff.inserir == [] and diff.apagar == []
+
+
+def test_linha_removida_e_apagada():
+    diff = diff_componentes(ORIGINAIS, editar(ORIGINAIS[1:]))
+    assert diff.apagar == [1]
+    assert diff.inserir == [] and diff.atualizar == []
+
+
+def test_linhas_em_branco_sao_ignoradas():
+    em_branco = {'id': math.nan, 'nome_ativo': None, 'ticker_exemplo': None, 'percentual': math.nan, 'justificativa': None}
+    diff = diff_componentes(ORIGINAIS, editar(ORIGINAIS + [em_branco]))
+    assert not diff
+
+
+# --- GRAVAÇÃO ---
+@pytest.fixture
+def banco():
+    banco = AlocacoesSQLite()
+    alocacao_id = salvar_alocacao(banco, 1, 'Alocação Moderada', DiffAlocacao(inserir=[
+        {k: v for k, v in c.items() if k != 'id'} for c in ORIGINAIS
+    ]))
+    return banco, alocacao_id
+
+
+def test_salvar_aplica_insercoes_atualizacoes_e_exclusoes(banco):
+    banco, alocacao_id = banco
+    originais = banco.componentes(alocacao_id)
+    editados = [
+        dict(originais[1], percentual=70),
+        {'id': math.nan, 'nome_ativo': 'Ouro', 'ticker_exemplo': 'GOLD11', 'percentual': 30, 'justificativa': 'Reserva.'},
+    ]
+    diff = diff_componentes(originais, editar(editados))
+
+    assert salvar_alocacao(banco, 1, 'Alocação Moderada', diff) == alocacao_id
+    componentes = banco.componentes(alocacao_id)
+    assert [(c['nome_ativo'], c['percentual']) for c in componentes] == [('Renda Fixa', 70.0), ('Ouro', 30.0)]
+
+
+def test_total_diferente_de_100_desfaz_tudo(banco):
+    banco, alocacao_id = banco
+    antes = banco.componentes(alocacao_id)
+    diff = diff_componentes(antes, editar([dict(antes[0], percentual=50)]))  # apaga a Renda Fixa e soma 50%
+    assert diff.apagar and diff.atualizar
+
+    with pytest.raises(ValueError, match='100%'):
+        salvar_alocacao(banco, 1, 'Outro Nome', diff)
+    assert banco.componentes(alocacao_id) == antes
+    assert banco.conn.execute('select nome_estrategia from alocacoes_modelo').fetchone()[0] == 'Alocação Moderada'
+
+
+def test_primeira_gravacao_cria_a_alocacao_do_perfil():
+    banco = AlocacoesSQLite()
+    diff = DiffAlocacao(inserir=[{'nome_ativo': 'Caixa', 'ticker_exemplo': None, 'percentual': 100.0, 'justificativa': None}])
+    alocacao_id = salvar_alocacao(banco, 3, 'Alocação Arrojada', diff)
+    assert [c['nome_ativo'] for c in banco.componentes(alocacao_id)] == ['Caixa']
+
+
+def test_primeira_gravacao_invalida_nao_deixa_alocacao_orfa():
+    banco = AlocacoesSQLite()
+    diff = DiffAlocacao(inserir=[{'nome_ativo': 'Caixa', 'ticker_exemplo': None, 'percentual': 80.0, 'justificativa': None}])
+    with pytest.raises(ValueError):
+        salvar_alocacao(banco, 3, 'Alocação Arrojada', diff)
+    assert banco.conn.execute('select count(*) from alocacoes_modelo').fetchone()[0] == 0
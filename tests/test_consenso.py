@@ -0,0 +1,83 @@
+"""Consenso incremental das gestoras: edições, exclusões e equivalência com a reconstrução."""
+import random
+
+import pytest
+
+from services.consenso import ConsensoGestoras
+
+
+def analise(analise_id, gestora_id=1, visao='Overweight', pais_id=3, data='2026-01-01', tipo='Macro'):
+    return {
+        'id': analise_id, 'tipo_analise': tipo, 'gestora_id': gestora_id, 'pais_id': pais_id,
+        'classe_de_ativo_id': None, 'tema_id': None, 'visao': visao, 'data_publicacao': data,
+    }
+
+
+def estado(consenso):
+    """Estatísticas e visões vigentes de todas as chaves, sem o histórico de mudanças."""
+    return {
+        chave: (ag.n_gestoras, pytest.approx(ag.score_liquido), pytest.approx(ag.dispersao), consenso.visoes(*chave))
+        for chave, ag in consenso._agregados.items()
+    }
+
+
+def test_mudar_a_gestora_da_unica_contribuicao_move_a_visao():
+    consenso = ConsensoGestoras(None)
+    consenso.aplicar(analise(1, gestora_id=1))
+    assert consenso.aplicar(analise(1, gestora_id=2)) == []
+    assert consenso.visoes('pais', 3) == {2: 'Overweight'}
+    assert consenso.agregado('pais', 3).n_gestoras == 1
+
+
+def test_mudar_a_gestora_e_o_pais_limpa_a_chave_antiga():
+    consenso = ConsensoGestoras(None)
+    consenso.aplicar(analise(1, gestora_id=1, pais_id=3))
+    consenso.aplicar(analise(1, gestora_id=2, pais_id=4))
+    assert consenso.agregado('pais', 3) is None
+    assert consenso.visoes('pais', 4) == {2: 'Overweight'}
+
+
+def test_remover_volta_a_visao_anterior_e_apaga_a_chave_vazia():
+    consenso = ConsensoGestoras(None)
+    consenso.aplicar(analise(1, visao='Neutral', data='2026-01-01'))
+    mudancas = consenso.aplicar(analise(2, visao='Underweight', data='2026-02-01'))
+    assert [(m.anterior, m.nova) for m in mudancas] == [('Neutral', 'Underweight')]
+
+    consenso.remover(2)
+    assert consenso.visoes('pais', 3) == {1: 'Neutral'}
+    consenso.remover(1)
+    assert consenso.agregado('pais', 3) is None
+    assert consenso.visoes('pais', 3) == {}
+
+
+def test_tipos_fora_da_dimensao_nao_contribuem():
+    consenso = ConsensoGestoras(None)
+    consenso.aplicar(analise(1, tipo='Asset'))
+    assert consenso.agregado('pais', 3) is None
+
+
+@pytest.mark.parametrize('semente', range(20))
+def test_incremental_igual_a_reconstrucao(semente):
+    rnd = random.Random(semente)
+    incremental = ConsensoGestoras(None)
+    linhas = {}
+    for _ in range(300):
+        analise_id = rnd.randint(1, 40)
+        if analise_id in linhas and rnd.random() < 0.25:
+            del linhas[analise_id]
+            incremental.remover(analise_id)
+            continue
+        linhas[analise_id] = analise(
+            analise_id,
+            gestora_id=rnd.randint(1, 4),
+            visao=rnd.choice(['Overweight', 'Neutral', 'Underweight', 'N/A']),
+            pais_id=rnd.randint(1, 3),
+            data=f"2026-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+            tipo=rnd.choice(['Macro', 'Macro', 'Asset']),
+        )
+        incremental.aplicar(linhas[analise_id])
+
+    reconstruido = ConsensoGestoras(None)
+    for row in linhas.values():
+        reconstruido.aplicar(row)
+    assert estado(incremental) == estado(reconstruido)
@@ -0,0 +1,43 @@
+"""Atualização incremental das matrizes de visões a partir do corpus."""
+import numpy as np
+
+from services.corpus import CorpusAnalises
+from services.heatmaps import MatrizVisoes
+
+
+def analise(analise_id, visao='Overweight', classe=1, pais=1, data='2026-01-01'):
+    return {
+        'id': analise_id, 'tipo_analise': 'Asset', 'visao': visao, 'gestora_id': 1,
+        'classe_de_ativo_id': classe, 'pais_id': pais, 'data_publicacao': data,
+    }
+
+
+def nova_matriz():
+    return MatrizVisoes('Asset', 'classe_de_ativo_id', 'pais_id')
+
+
+def test_carga_completa_com_linha_editada_reconstroi_a_matriz():
+    rows = [analise(1, data='2026-01-01'), analise(2, data='2026-01-02')]
+    matriz = nova_matriz()
+    matriz.atualizar(CorpusAnalises.from_rows(rows), [1], [1])
+    assert matriz.score[0, 0] == 1.0
+
+    rows[1]['visao'] = 'Underweight'  # mesmos ids, na mesma ordem
+    assert matriz.atualizar(CorpusAnalises.from_rows(rows), [1], [1])
+    assert matriz.score[0, 0] == -1.0
+    assert matriz.contagem[0, 0] == 2
+
+
+def test_linhas_acrescentadas_equivalem_a_reconstruir():
+    rows = [analise(i, visao=v, classe=1 + i % 2, pais=1 + i % 3, data=f'2026-01-{10 + i}')
+            for i, v in enumerate(['Overweight', 'Neutral', 'Underweight', 'N/A'] * 3, 1)]
+    corpus = CorpusAnalises.from_rows(rows[:5])
+    incremental = nova_matriz()
+    incremental.atualizar(corpus, [1, 2], [1, 2, 3])
+    incremental.atualizar(corpus.concatenar(CorpusAnalises.from_rows(rows[5:])), [1, 2], [1, 2, 3])
+
+    reconstruida = nova_matriz()
+    reconstruida.atualizar(CorpusAnalises.from_rows(rows), [1, 2], [1, 2, 3])
+    np.testing.assert_array_equal(incremental.contagem, reconstruida.contagem)
+    np.testing.assert_array_equal(incremental.score, reconstruida.score)
+    np.testing.assert_array_equal(incremental.data, reconstruida.data)
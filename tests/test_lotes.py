@@ -0,0 +1,18 @@
+"""Leitura em lotes sob o limite de linhas por resposta do servidor."""
+import pytest
+
+from services.lotes import buscar_em_lotes
+from tools.fake_supabase import FakeSupabase
+
+
+@pytest.mark.parametrize('max_linhas', [7, 50, 1000])
+def test_le_todas_as_linhas_com_qualquer_limite_do_servidor(max_linhas):
+    client = FakeSupabase({'analises': [{'id': i} for i in range(1, 121)]}, max_linhas=max_linhas)
+    rows = buscar_em_lotes(lambda: client.table('analises').select('id'))
+    assert [r['id'] for r in rows] == list(range(1, 121))
+
+
+def test_continua_apos_o_id_dado():
+    client = FakeSupabase({'analises': [{'id': i} for i in range(1, 31)]}, max_linhas=10)
+    rows = buscar_em_lotes(lambda: client.table('analises').select('id'), apos_id=25)
+    assert [r['id'] for r in rows] == [26, 27, 28, 29, 30]
@@ -0,0 +1 @@
+"""Ferramentas de desenvolvimento da Plataforma Offshore (testes de carga, backends locais)."""
@@ -0,0 +1,280 @@
+"""Backend local em memória que imita o subconjunto do cliente Supabase usado pelas páginas.
+
+Suporta `select` com embeds de um nível (`gestoras(nome)`), os filtros usados no código
+(`eq`, `neq`, `gt`, `gte`, `lt`, `lte`, `in_`, `ilike`, `or_`), `order`, `limit`,
+`single`, `insert`, `update` e `delete`. Cada `execute()` espera a latência configurada,
+para simular a ida e volta ao banco, e os selects devolvem no máximo `max_linhas` linhas,
+como o `db-max-rows` do PostgREST.
+"""
+import random
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+# Tabela embutida -> coluna de chave estrangeira na tabela principal
+CHAVES_ESTRANGEIRAS = {
+    'gestoras': 'gestora_id',
+    'paises': 'pais_id',
+    'classes_de_ativos': 'classe_de_ativo_id',
+    'subclasses_de_ativos': 'subclasse_de_ativo_id',
+    'temas': 'tema_id',
+}
+
+
+def _dividir(texto):
+    """Separa por vírgulas de nível superior, respeitando parênteses e aspas."""
+    partes, nivel, aspas, atual = [], 0, False, ''
+    for c in texto:
+        if c == '"':
+            aspas = not aspas
+        elif not aspas and c in '()':
+            nivel += 1 if c == '(' else -1
+        elif not aspas and c == ',' and nivel == 0:
+            partes.append(atual.strip())
+            atual = ''
+            continue
+        atual += c
+    return partes + [atual.strip()] if atual.strip() else partes
+
+
+def _comparar(op, valor, alvo):
+    if op == 'not':
+        op, alvo = alvo.split('.', 1)
+        return not _comparar(op, valor, alvo)
+    if op == 'is':
+        return valor is None if alvo == 'null' else str(valor).lower() == alvo
+    if op in ('eq', 'neq'):
+        igual = valor == alvo or (valor is not None and alvo is not None and str(valor) == str(alvo))
+        return igual if op == 'eq' else not igual
+    if valor is None:
+        return False
+    if isinstance(valor, (int, float)) and not isinstance(alvo, (int, float)):
+        alvo = type(valor)(alvo)
+    elif not isinstance(valor, (int, float)):
+        valor, alvo = str(valor), str(alvo)
+    return {'gt': valor > alvo, 'gte': valor >= alvo, 'lt': valor < alvo, 'lte': valor <= alvo}[op]
+
+
+def _expressao_or(texto):
+    """Converte uma expressão `or_` do PostgREST num predicado sobre a linha."""
+    termos = []
+    for termo in _dividir(texto):
+        grupo = re.fullmatch(r'(and|or)\((.*)\)', termo)
+        if grupo:
+            sub = [_expressao_or(t) for t in _dividir(grupo.group(2))]
+            termos.append((lambda fs: lambda r: all(f(r) for f in fs))(sub) if grupo.group(1) == 'and'
+                          else (lambda fs: lambda r: any(f(r) for f in fs))(sub))
+            continue
+        coluna, op, valor = termo.split('.', 2)
+        valor = valor.strip('"')
+        termos.append(lambda r, c=coluna, o=op, v=valor: _comparar(o, r.get(c), v))
+    return lambda r: any(f(r) for f in termos)
+
+
+class _Query:
+    def __init__(self, backend, tabela):
+        self.backend = backend
+        self.tabela = tabela
+        self.operacao = 'select'
+        self.colunas = '*'
+        self.payload = None
+        self.filtros = []
+        self.ordens = []
+        self.limite = None
+        self.unico = False
+
+    # --- CONSTRUÇÃO ---
+    def select(self, colunas='*'):
+        self.colunas = colunas
+        return self
+
+    def insert(self, payload):
+        self.operacao, self.payload = 'insert', payload
+        return self
+
+    def update(self, payload):
+        self.operacao, self.payload = 'update', payload
+        return self
+
+    def delete(self):
+        self.operacao = 'delete'
+        return self
+
+    def _filtro(self, op, coluna, valor):
+        self.filtros.append(lambda r: _comparar(op, r.get(coluna), valor))
+        return self
+
+    def eq(self, coluna, valor): return self._filtro('eq', coluna, valor)
+    def neq(self, coluna, valor): return self._filtro('neq', coluna, valor)
+    def gt(self, coluna, valor): return self._filtro('gt', coluna, valor)
+    def gte(self, coluna, valor): return self._filtro('gte', coluna, valor)
+    def lt(self, coluna, valor): return self._filtro('lt', coluna, valor)
+    def lte(self, coluna, valor): return self._filtro('lte', coluna, valor)
+
+    def in_(self, coluna, valores):
+        valores = {str(v) for v in valores}
+        self.filtros.append(lambda r: str(r.get(coluna)) in valores)
+        return self
+
+    def ilike(self, coluna, padrao):
+        regex = re.compile(re.escape(padrao).replace('%', '.*'), re.IGNORECASE)
+        self.filtros.append(lambda r: bool(regex.fullmatch(str(r.get(coluna) or ''))))
+        return self
+
+    def or_(self, expressao):
+        self.filtros.append(_expressao_or(expressao))
+        return self
+
+    def order(self, coluna, desc=False, nullsfirst=None):
+        # Sem `nullsfirst`, segue o Postgres: nulos no fim em ordem asc e no início em desc
+        self.ordens.append((coluna, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, n):
+        self.limite = n
+        return self
+
+    def single(self):
+        self.unico = True
+        return self
+
+    # --- EXECUÇÃO ---
+    def _projetar(self, row):
+        colunas = _dividir(self.colunas)
+        saida = dict(row) if '*' in colunas else {}
+        for coluna in colunas:
+            embed = re.fullmatch(r'(\w+)\((.*)\)', coluna)
+            if embed:
+                tabela, campos = embed.group(1), _dividir(embed.group(2))
+                alvo = self.backend.por_id(tabela, row.get(CHAVES_ESTRANGEIRAS[tabela]))
+                saida[tabela] = {c: alvo[c] for c in campos} if alvo else None
+            elif coluna != '*':
+                saida[coluna] = row.get(coluna)
+        return saida
+
+    def execute(self):
+        self.backend.esperar()
+        with self.backend.lock:
+            linhas = self.backend.tabelas.setdefault(self.tabela, [])
+            if self.operacao == 'insert':
+                novas = self.payload if isinstance(self.payload, list) else [self.payload]
+                data = [self.backend.inserir(self.tabela, dict(r)) for r in novas]
+            else:
+                selecionadas = [r for r in linhas if all(f(r) for f in self.filtros)]
+                if self.operacao == 'update':
+                    for r in selecionadas:
+                        r.update(self.payload)
+                    data = [dict(r) for r in selecionadas]
+                elif self.operacao == 'delete':
+                    ids = {id(r) for r in selecionadas}
+                    linhas[:] = [r for r in linhas if id(r) not in ids]
+                    data = selecionadas
+                else:
+                    for coluna, desc, nulos_primeiro in reversed(self.ordens):
+                        nulos = [r for r in selecionadas if r.get(coluna) is None]
+                        valores = sorted((r for r in selecionadas if r.get(coluna) is not None),
+                                         key=lambda r: r.get(coluna), reverse=desc)
+                        selecionadas = nulos + valores if nulos_primeiro else valores + nulos
+                    limite = min(self.limite, self.backend.max_linhas) if self.limite is not None else self.backend.max_linhas
+                    selecionadas = selecionadas[:limite]
+                    data = [self._projetar(r) for r in selecionadas]
+        if self.unico:
+            if len(data) != 1:
+                raise RuntimeError(f"JSON object requested, multiple (or no) rows returned ({len(data)})")
+            data = data[0]
+        return SimpleNamespace(data=data)
+
+
+class FakeSupabase:
+    """Cliente falso com tabelas em memória e latência injetada por requisição."""
+
+    def __init__(self, tabelas=None, latencia=0.0, jitter=0.0, semente=None, max_linhas=1000):
+        self.tabelas = tabelas or {}
+        self.max_linhas = max_linhas
+        self.latencia = latencia
+        self.jitter = jitter
+        self.requisicoes = 0
+        self.lock = threading.Lock()
+        self._random = random.Random(semente)
+        self._indices = {}
+
+    def table(self, nome):
+        return _Query(self, nome)
+
+    def esperar(self):
+        with self.lock:
+            self.requisicoes += 1
+        atraso = self.latencia + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if atraso > 0:
+            time.sleep(atraso)
+
+    def por_id(self, tabela, valor_id):
+        if valor_id is None:
+            return None
+        indice = self._indices.get(tabela)
+        if indice is None or len(indice) != len(self.tabelas.get(tabela, ())):
+            indice = self._indices[tabela] = {r['id']: r for r in self.tabelas.get(tabela, ())}
+        return indice.get(valor_id)
+
+    def inserir(self, tabela, row):
+        linhas = self.tabelas.setdefault(tabela, [])
+        row.setdefault('id', max((r['id'] for r in linhas), default=0) + 1)
+        row.setdefault('created_at', datetime.now().isoformat())
+        linhas.append(row)
+        return dict(row)
+
+
+# --- DADOS SINTÉTICOS ---
+TIPOS_ANALISE = ["Macro", "Visão BC", "Tese", "Asset", "MicroAsset", "Thematic"]
+VISOES = ["Overweight", "Neutral", "Underweight", "N/A"]
+
+
+def gerar_dados(n_analises=2000, n_paises=20, n_gestoras=15, n_temas=10, semente=42):
+    """Gera um conjunto de tabelas coerente com o esquema usado pelas páginas."""
+    rnd = random.Random(semente)
+    hoje = date.today()
+    paises = [{'id': i, 'nome': f"País {i:02d}", 'emoji_bandeira': '🏳️'} for i in range(1, n_paises + 1)]
+    gestoras = [{'id': i, 'nome': f"Gestora {i:02d}"} for i in range(1, n_gestoras + 1)]
+    classes = [{'id': i, 'nome': nome} for i, nome in enumerate(["Ações", "Renda Fixa", "Crédito", "Commodities", "Moedas"], 1)]
+    subclasses = [{'id': c['id'] * 10 + j, 'nome': f"{c['nome']} {j}", 'classe_pai_id': c['id']} for c in classes for j in range(1, 4)]
+    temas = [{'id': i, 'nome': f"Tema {i:02d}"} for i in range(1, n_temas + 1)]
+
+    analises = []
+    for i in range(1, n_analises + 1):
+        classe = rnd.choice(classes)
+        analises.append({
+            'id': i,
+            'titulo': f"Análise {i}",
+            'tipo_analise': rnd.choice(TIPOS_ANALISE),
+            'visao': rnd.choice(VISOES),
+            'pais_id': rnd.choice(paises)['id'],
+            'gestora_id': rnd.choice(gestoras)['id'],
+            'classe_de_ativo_id': classe['id'],
+            'subclasse_de_ativo_id': classe['id'] * 10 + rnd.randint(1, 3),
+            'tema_id': rnd.choice(temas)['id'],
+            'data_publicacao': (hoje - timedelta(days=rnd.randint(0, 720))).isoformat(),
+            'resumo': f"Resumo da análise {i}. " * 5,
+            'texto_completo': f"Texto completo da análise {i}. " * 80,
+        })
+
+    alertas = [{'id': i, 'titulo': f"Alerta {i}", 'tipo_alerta': 'Notícia', 'importancia': rnd.choice(['Alta', 'Média', 'Baixa']),
+                'descricao': '', 'created_at': (datetime.now() - timedelta(hours=i)).isoformat()} for i in range(1, 21)]
+    eventos = [{'id': i, 'data_evento': (hoje + timedelta(days=rnd.randint(0, 120))).isoformat(), 'nome_evento': f"Evento {i}",
+                'importancia': rnd.choice(['Alta', 'Média', 'Baixa']), 'pais_id': rnd.choice(paises)['id']} for i in range(1, 201)]
+    indicadores = [{'id': p['id'] * 10 + j, 'pais_id': p['id'], 'nome_indicador': nome, 'valor_atual': f"{rnd.uniform(0, 10):.1f}%",
+                    'data_referencia': hoje.isoformat(), 'tendencia': 'N/A'}
+                   for p in paises for j, nome in enumerate(["PIB", "Inflação", "Juros", "Desemprego"])]
+
+    perfis = [{'id': i, 'nome': nome} for i, nome in enumerate(["Conservador", "Moderado", "Arrojado"], 1)]
+    alocacoes = [{'id': p['id'], 'perfil_de_risco_id': p['id'], 'nome_estrategia': f"Alocação {p['nome']} Global"} for p in perfis]
+    componentes = [{'id': a['id'] * 10 + j, 'alocacao_modelo_id': a['id'], 'nome_ativo': f"Ativo {j}", 'ticker_exemplo': f"TCK{j}",
+                    'percentual': 25.0, 'justificativa': "Diversificação."} for a in alocacoes for j in range(4)]
+
+    return {
+        'paises': paises, 'gestoras': gestoras, 'classes_de_ativos': classes, 'subclasses_de_ativos': subclasses,
+        'temas': temas, 'analises': analises, 'alertas': alertas, 'eventos_calendario': eventos,
+        'indicadores_economicos': indicadores, 'perfis_de_risco': perfis, 'alocacoes_modelo': alocacoes,
+        'componentes_alocacao': componentes,
+    }
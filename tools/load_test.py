@@ -0,0 +1,255 @@
+"""Teste de carga com sessões simultâneas do Streamlit contra um backend falso.
+
+Cada sessão simulada é um `AppTest` que percorre uma jornada roteirizada; todas
+partilham o mesmo processo e, portanto, os mesmos `st.cache_resource`, como num
+servidor real. Cada nível de concorrência roda num subprocesso próprio para que o
+pico de RSS medido corresponda apenas àquele nível.
+
+Uso:
+    python -m tools.load_test --sessoes 1 5 10 25 --latencia-ms 40 --jornadas hub estrategia
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+PAGINA_INTELIGENCIA = next(RAIZ.glob('pages/1_*.py'))
+PAGINA_ESTRATEGIA = next(RAIZ.glob('pages/2_*.py'))
+TIMEOUT_RERUN = 120
+
+
+# --- BACKEND FALSO ---
+def instalar_backend(latencia, jitter, n_analises):
+    """Substitui o módulo `supabase` por um que devolve o cliente falso partilhado."""
+    from tools.fake_supabase import FakeSupabase, gerar_dados
+
+    cliente = FakeSupabase(gerar_dados(n_analises=n_analises), latencia=latencia, jitter=jitter)
+    modulo = types.ModuleType('supabase')
+    modulo.Client = FakeSupabase
+    modulo.create_client = lambda url, key: cliente
+    sys.modules['supabase'] = modulo
+    return cliente
+
+
+# --- CONCORRÊNCIA DO APPTEST ---
+# O AppTest foi feito para um teste de cada vez; estes ajustes deixam várias sessões
+# rodarem em threads do mesmo processo sem erros espúrios do próprio harness.
+def serializar_compilacao():
+    """Compila as páginas uma de cada vez entre todas as sessões.
+
+    Cada `AppTest` tem o seu próprio `ScriptCache`, e `ast.parse`/`compile` em threads
+    simultâneas falham ao acaso no CPython < 3.11.8 (gh-106905) com
+    "AST constructor recursion depth mismatch".
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    original = ScriptCache.get_bytecode
+    lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with lock:
+            return original(self, script_path)
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def partilhar_runtime():
+    """Mantém um `Runtime` disponível enquanto houver alguma execução em curso.
+
+    Cada `AppTest.run` instala um `Runtime` falso no singleton global e apaga-o ao
+    terminar, deixando sem runtime ("Runtime hasn't been created!") as outras sessões
+    que ainda estão a meio de uma execução.
+    """
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.testing.v1.app_test import AppTest
+
+    lock = threading.Lock()
+    estado = {'ativas': 0, 'ultimo': None}
+    run_original = AppTest._run
+
+    def _run(self, *args, **kwargs):
+        with lock:
+            estado['ativas'] += 1
+        try:
+            return run_original(self, *args, **kwargs)
+        finally:
+            with lock:
+                estado['ativas'] -= 1
+
+    def atual(cls):
+        if cls._instance is not None:
+            estado['ultimo'] = cls._instance
+            return cls._instance
+        return estado['ultimo'] if estado['ativas'] else None
+
+    def instance(cls):
+        runtime = atual(cls)
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime
+
+    AppTest._run = _run
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: atual(cls) is not None)
+
+
+# --- JORNADAS ---
+def _app(pagina):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(pagina), default_timeout=TIMEOUT_RERUN)
+    at.secrets['SUPABASE_URL'] = 'http://localhost'
+    at.secrets['SUPABASE_KEY'] = 'fake'
+    at.secrets['ADMIN_PASSWORD'] = 'fake'
+    return at
+
+
+def _por_rotulo(elementos, prefixo):
+    return next(e for e in elementos if e.label.startswith(prefixo))
+
+
+def jornada_hub(medir, sessao):
+    """Hub → troca de país na Macro View → Thematic View → geração do relatório."""
+    at = _app(PAGINA_INTELIGENCIA)
+    medir(at.run)
+    pais = _por_rotulo(at.selectbox, "Selecione um país ou região")
+    medir(pais.set_value(pais.options[(sessao + 1) % len(pais.options)]).run)
+    tema = at.selectbox(key="tema_select")
+    medir(tema.set_value(tema.options[1 + sessao % (len(tema.options) - 1)]).run)
+    paises_relatorio = _por_rotulo(at.multiselect, "Análises Macro por País")
+    medir(paises_relatorio.set_value(paises_relatorio.options[:2]).run)
+    medir(_por_rotulo(at.button, "Gerar Relatório").click().run)
+    return at
+
+
+def jornada_estrategia(medir, sessao):
+    """Questionário do Global Strategy → resultado com a alocação sugerida."""
+    at = _app(PAGINA_ESTRATEGIA)
+    medir(at.run)
+    for chave in ("q1", "q2", "q3"):
+        radio = at.radio(key=chave)
+        medir(radio.set_value(radio.options[sessao % len(radio.options)]).run)
+    medir(_por_rotulo(at.button, "Descobrir Meu Perfil").click().run)
+    return at
+
+
+JORNADAS = {'hub': jornada_hub, 'estrategia': jornada_estrategia}
+
+
+# --- EXECUÇÃO DE UM NÍVEL ---
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+
+def executar_nivel(n_sessoes, jornadas, repeticoes, latencia, jitter, n_analises):
+    from services.coalescencia import get_consultas
+
+    cliente = instalar_backend(latencia, jitter, n_analises)
+    serializar_compilacao()
+    partilhar_runtime()
+    latencias, erros = [], []
+    lock = threading.Lock()
+
+    def medir(rerun):
+        inicio = time.perf_counter()
+        at = rerun()
+        duracao = time.perf_counter() - inicio
+        with lock:
+            latencias.append(duracao)
+            if at.exception:
+                erros.append(str(at.exception[0].message))
+        return at
+
+    def sessao(indice):
+        try:
+            for _ in range(repeticoes):
+                for nome in jornadas:
+                    JORNADAS[nome](medir, indice)
+        except Exception as e:
+            with lock:
+                erros.append(f"{type(e).__name__}: {e}")
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(n_sessoes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    # Mesma instância usada pelas páginas: o cache_resource ignora o parâmetro `_client`
+    coalescidas = get_consultas(cliente).estatisticas()
+
+    return {
+        'sessoes': n_sessoes,
+        'reruns': len(latencias),
+        'duracao_s': duracao,
+        'reruns_por_s': len(latencias) / duracao if duracao else 0.0,
+        'p50_ms': _percentil(latencias, 50) * 1000,
+        'p95_ms': _percentil(latencias, 95) * 1000,
+        'p99_ms': _percentil(latencias, 99) * 1000,
+        # ru_maxrss vem em KiB no Linux
+        'pico_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'requisicoes_backend': cliente.requisicoes,
+        'consultas_coalescidas': coalescidas['chamadas'],
+        'consultas_deduplicadas': coalescidas['deduplicadas'],
+        'erros': erros[:5],
+        'n_erros': len(erros),
+    }
+
+
+# --- RELATÓRIO ---
+def imprimir_relatorio(resultados):
+    cabecalho = f"{'sessões':>8} {'reruns':>7} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'req. BD':>8} {'coalesc.':>9} {'dedup.':>7} {'erros':>6}"
+    print(cabecalho)
+    print('-' * len(cabecalho))
+    for r in resultados:
+        print(f"{r['sessoes']:>8} {r['reruns']:>7} {r['reruns_por_s']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['pico_rss_mb']:>8.1f} {r['requisicoes_backend']:>8} {r['consultas_coalescidas']:>9} {r['consultas_deduplicadas']:>7} {r['n_erros']:>6}")
+    for r in resultados:
+        for erro in r['erros']:
+            print(f"[{r['sessoes']} sessões] {erro}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 5, 10], help="Níveis de sessões simultâneas")
+    parser.add_argument('--jornadas', nargs='+', choices=sorted(JORNADAS), default=sorted(JORNADAS))
+    parser.add_argument('--repeticoes', type=int, default=1, help="Vezes que cada sessão repete as jornadas")
+    parser.add_argument('--latencia-ms', type=float, default=30.0, help="Latência injetada por requisição ao backend")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="Variação aleatória somada à latência")
+    parser.add_argument('--analises', type=int, default=2000, help="Tamanho do corpus sintético de análises")
+    parser.add_argument('--json', action='store_true', help="Imprime os resultados em JSON")
+    parser.add_argument('--nivel', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    parametros = (args.jornadas, args.repeticoes, args.latencia_ms / 1000, args.jitter_ms / 1000, args.analises)
+    if args.nivel is not None:
+        sys.path.insert(0, str(RAIZ))
+        print(json.dumps(executar_nivel(args.nivel, *parametros)))
+        return
+
+    resultados = []
+    for n in args.sessoes:
+        comando = [sys.executable, '-m', 'tools.load_test', '--nivel', str(n), '--jornadas', *args.jornadas,
+                   '--repeticoes', str(args.repeticoes), '--latencia-ms', str(args.latencia_ms),
+                   '--jitter-ms', str(args.jitter_ms), '--analises', str(args.analises)]
+        saida = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(saida.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        imprimir_relatorio(resultados)
+
+
+if __name__ == '__main__':
+    main()
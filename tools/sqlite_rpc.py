@@ -0,0 +1,74 @@
+"""Substituto local, em SQLite, da função `salvar_componentes_alocacao` do Supabase.
+
+Reproduz a semântica de sql/salvar_componentes_alocacao.sql (tudo ou nada numa
+transação) e expõe `rpc(...).execute()` como o cliente Supabase, para exercitar o
+caminho de gravação do Admin sem um banco Postgres (ver tests/test_alocacoes.py).
+"""
+import sqlite3
+from types import SimpleNamespace
+
+ESQUEMA = """
+create table if not exists alocacoes_modelo (
+    id integer primary key,
+    perfil_de_risco_id integer not null,
+    nome_estrategia text
+);
+create table if not exists componentes_alocacao (
+    id integer primary key,
+    alocacao_modelo_id integer not null references alocacoes_modelo(id),
+    nome_ativo text,
+    ticker_exemplo text,
+    percentual real,
+    justificativa text
+);
+"""
+COLUNAS_EDITAVEIS = ('nome_ativo', 'ticker_exemplo', 'percentual', 'justificativa')
+
+
+class _Chamada:
+    def __init__(self, funcao, params):
+        self.funcao = funcao
+        self.params = params
+
+    def execute(self):
+        return SimpleNamespace(data=self.funcao(**self.params))
+
+
+class AlocacoesSQLite:
+    def __init__(self, caminho=':memory:'):
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(ESQUEMA)
+
+    def rpc(self, nome, params):
+        return _Chamada(getattr(self, nome), params)
+
+    def salvar_componentes_alocacao(self, p_perfil_id, p_nome_estrategia, p_inserir=(), p_atualizar=(), p_apagar=()):
+        with self.conn:  # commit no fim, rollback em qualquer exceção
+            cur = self.conn.cursor()
+            row = cur.execute('select id from alocacoes_modelo where perfil_de_risco_id = ? limit 1', (p_perfil_id,)).fetchone()
+            if row is None:
+                cur.execute('insert into alocacoes_modelo (perfil_de_risco_id, nome_estrategia) values (?, ?)', (p_perfil_id, p_nome_estrategia))
+                alocacao_id = cur.lastrowid
+            else:
+                alocacao_id = row['id']
+                cur.execute('update alocacoes_modelo set nome_estrategia = ? where id = ?', (p_nome_estrategia, alocacao_id))
+
+            cur.executemany('delete from componentes_alocacao where alocacao_modelo_id = ? and id = ?',
+                            [(alocacao_id, componente_id) for componente_id in p_apagar])
+            for alteracao in p_atualizar:
+                colunas = [c for c in COLUNAS_EDITAVEIS if c in alteracao]
+                if colunas:
+                    cur.execute(f"update componentes_alocacao set {', '.join(f'{c} = ?' for c in colunas)} where id = ? and alocacao_modelo_id = ?",
+                                [alteracao[c] for c in colunas] + [alteracao['id'], alocacao_id])
+            cur.executemany('insert into componentes_alocacao (alocacao_modelo_id, nome_ativo, ticker_exemplo, percentual, justificativa) values (?, ?, ?, ?, ?)',
+                            [(alocacao_id, *(c.get(col) for col in COLUNAS_EDITAVEIS)) for c in p_inserir])
+
+            total = cur.execute('select coalesce(sum(percentual), 0) from componentes_alocacao where alocacao_modelo_id = ?', (alocacao_id,)).fetchone()[0]
+            if not 99.9 <= total <= 100.1:
+                raise ValueError(f"A soma dos percentuais deve ser 100%. Soma atual: {total}")
+            return alocacao_id
+
+    def componentes(self, alocacao_id):
+        rows = self.conn.execute('select * from componentes_alocacao where alocacao_modelo_id = ? order by id', (alocacao_id,))
+        return [dict(r) for r in rows]